@@ -0,0 +1,122 @@
+import base64
+from http import HTTPStatus
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='api_author')
+        cls.reader = User.objects.create_user(username='api_reader')
+        cls.group = Group.objects.create(
+            title='Группа API',
+            slug='api_group',
+            description='Тестовое описание'
+        )
+        for i in range(12):
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author, group=cls.group
+            )
+        cls.post = Post.objects.create(text='Последний', author=cls.author)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_posts_are_cursor_paginated(self):
+        response = self.client.get(reverse('api:post_list'))
+        data = response.json()
+        self.assertNotIn('count', data)
+        self.assertIsNone(data['previous'])
+        self.assertEqual(len(data['results']), 10)
+        self.assertEqual(data['results'][0]['text'], self.post.text)
+        data = self.client.get(data['next']).json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertIsNone(data['next'])
+
+    def test_foreign_cursor_returns_first_page(self):
+        for raw in (
+            'n|2026-01-01T00:00:00+03:00|1',
+            f'n|2026-01-01T00:00:00|{2 ** 63}',
+        ):
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+            with self.subTest(raw=raw):
+                response = self.client.get(
+                    reverse('api:post_list'), {'cursor': cursor}
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertIsNone(response.json()['previous'])
+
+    def test_sparse_fields(self):
+        response = self.client.get(
+            reverse('api:post_detail', args=[self.post.id]),
+            {'fields': 'id,author'}
+        )
+        self.assertEqual(
+            response.json(),
+            {'id': self.post.id, 'author': self.author.username}
+        )
+
+    def test_related_endpoints(self):
+        urls = {
+            reverse('api:comment_list', args=[self.post.id]): 1,
+            reverse('api:group_posts', args=[self.group.slug]): 10,
+            reverse('api:profile_posts', args=[self.author.username]): 10,
+        }
+        for url, expected in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(len(response.json()['results']), expected)
+        profile = self.client.get(
+            reverse('api:profile', args=[self.author.username])
+        ).json()
+        self.assertEqual(profile['posts_count'], 13)
+
+    def test_etag_not_modified_until_write(self):
+        url = reverse('api:post_list')
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+        Post.objects.create(text='Новый', author=self.author)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_follow_changes_profile_etag(self):
+        urls = {
+            reverse('api:profile', args=[self.author.username]):
+                'followers_count',
+            reverse('api:profile', args=[self.reader.username]):
+                'following_count',
+        }
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+        Follow.objects.create(user=self.reader, author=self.author)
+        for url, field in urls.items():
+            with self.subTest(url=url):
+                response = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url]
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+                self.assertEqual(response.json()[field], 1)
+
+    def test_follow_feed(self):
+        url = reverse('api:follow')
+        self.assertEqual(
+            self.client.get(url).status_code, HTTPStatus.FORBIDDEN
+        )
+        self.assertEqual(self.reader_client.get(url).json()['results'], [])
+        Follow.objects.create(user=self.reader, author=self.author)
+        data = self.reader_client.get(url).json()
+        self.assertEqual(data['results'][0]['id'], self.post.id)
+        etag = self.reader_client.get(url)['ETag']
+        post = Post.objects.create(text='Новый', author=self.author)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.json()['results'][0]['id'], post.id)
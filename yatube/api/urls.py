@@ -0,0 +1,41 @@
+from django.urls import path
+
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('posts/', views.PostList.as_view(), name='post_list'),
+    path(
+        'posts/<int:pk>/',
+        views.PostDetail.as_view(),
+        name='post_detail'
+    ),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.CommentList.as_view(),
+        name='comment_list'
+    ),
+    path('groups/', views.GroupList.as_view(), name='group_list'),
+    path(
+        'groups/<slug:slug>/',
+        views.GroupDetail.as_view(),
+        name='group_detail'
+    ),
+    path(
+        'groups/<slug:slug>/posts/',
+        views.GroupPostList.as_view(),
+        name='group_posts'
+    ),
+    path(
+        'profiles/<str:username>/',
+        views.ProfileDetail.as_view(),
+        name='profile'
+    ),
+    path(
+        'profiles/<str:username>/posts/',
+        views.ProfilePostList.as_view(),
+        name='profile_posts'
+    ),
+    path('follow/', views.FollowFeed.as_view(), name='follow'),
+]
@@ -0,0 +1,128 @@
+import hashlib
+
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response
+from rest_framework import generics
+from rest_framework.permissions import IsAuthenticated
+
+from posts import caching
+from posts.models import Group, Post, TimelineEntry, User
+from posts.serializers import (CommentSerializer, GroupSerializer,
+                               PostSerializer, ProfileSerializer)
+
+
+class ETagMixin:
+    """ETag из поколений кэша лент: 304 отдаётся без запросов к базе.
+
+    Любая запись в посты, комментарии, группы и профили меняет
+    глобальное поколение, поэтому ETag меняется вместе с данными.
+    """
+
+    def get_etag_parts(self):
+        return [caching.generation(caching.GLOBAL)]
+
+    def get_etag(self):
+        parts = [
+            *self.get_etag_parts(),
+            self.request.get_full_path(),
+            self.request.META.get('HTTP_ACCEPT', ''),
+        ]
+        digest = hashlib.md5(':'.join(map(str, parts)).encode()).hexdigest()
+        return f'"{digest}"'
+
+    def get(self, request, *args, **kwargs):
+        etag = self.get_etag()
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            response = super().get(request, *args, **kwargs)
+        response['ETag'] = etag
+        return response
+
+
+class PostList(ETagMixin, generics.ListAPIView):
+    queryset = Post.objects.select_related('author', 'group')
+    serializer_class = PostSerializer
+
+
+class PostDetail(ETagMixin, generics.RetrieveAPIView):
+    queryset = Post.objects.select_related('author', 'group')
+    serializer_class = PostSerializer
+
+
+class CommentList(ETagMixin, generics.ListAPIView):
+    serializer_class = CommentSerializer
+    cursor_options = {'key_field': 'created', 'descending': False}
+
+    def get_queryset(self):
+        post = get_object_or_404(Post, pk=self.kwargs['post_id'])
+        return post.comments.select_related('author')
+
+
+class GroupList(ETagMixin, generics.ListAPIView):
+    queryset = Group.objects.order_by('title')
+    serializer_class = GroupSerializer
+    pagination_class = None
+
+
+class GroupDetail(ETagMixin, generics.RetrieveAPIView):
+    queryset = Group.objects.all()
+    serializer_class = GroupSerializer
+    lookup_field = 'slug'
+
+
+class GroupPostList(ETagMixin, generics.ListAPIView):
+    serializer_class = PostSerializer
+
+    def get_queryset(self):
+        group = get_object_or_404(Group, slug=self.kwargs['slug'])
+        return group.posts.select_related('author', 'group')
+
+
+class ProfileDetail(ETagMixin, generics.RetrieveAPIView):
+    queryset = User.objects.select_related('stats')
+    serializer_class = ProfileSerializer
+    lookup_field = 'username'
+
+    def get_etag_parts(self):
+        # Подписки не меняют глобальное поколение: followers_count
+        # и following_count меняют поколения AUTHOR и FOLLOWER профиля.
+        # Ради них — один запрос id по username.
+        user_id = User.objects.filter(
+            username=self.kwargs['username']
+        ).values_list('pk', flat=True).first()
+        versions = caching.generations(
+            [(caching.AUTHOR, user_id), (caching.FOLLOWER, user_id)]
+        )
+        return [*super().get_etag_parts(), user_id, *versions.values()]
+
+
+class ProfilePostList(ETagMixin, generics.ListAPIView):
+    serializer_class = PostSerializer
+
+    def get_queryset(self):
+        author = get_object_or_404(User, username=self.kwargs['username'])
+        return author.posts.select_related('author', 'group')
+
+
+class FollowFeed(ETagMixin, generics.ListAPIView):
+    serializer_class = PostSerializer
+    permission_classes = (IsAuthenticated,)
+    cursor_options = {'id_field': 'post_id'}
+
+    def get_etag_parts(self):
+        # Посты авторов меняют глобальное поколение, подписки и отписки —
+        # поколение читателя.
+        user_id = self.request.user.pk
+        return [
+            *super().get_etag_parts(),
+            user_id,
+            caching.generation(caching.FOLLOWER, user_id),
+        ]
+
+    def get_queryset(self):
+        return TimelineEntry.objects.filter(
+            user=self.request.user
+        ).select_related('post__author', 'post__group')
+
+    def paginate_queryset(self, queryset):
+        return [entry.post for entry in super().paginate_queryset(queryset)]
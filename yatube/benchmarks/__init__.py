@@ -0,0 +1,8 @@
+"""Бенчмарки производительности yatube.
+
+Запускаются из каталога с manage.py как модули, например:
+    python -m benchmarks.indexes --posts 20000
+
+Каждый бенчмарк работает на собственной временной базе SQLite
+и не трогает db.sqlite3 проекта.
+"""
@@ -0,0 +1,122 @@
+"""LocMemCache против общего SQLiteCache (core.cache).
+
+    python -m benchmarks.cache --workers 4 --lookups 20000
+
+Первая таблица — задержка отдельных операций в одном процессе.
+Вторая — несколько процессов, как воркеры gunicorn, читают фрагменты
+по ключам с распределением Ципфа и кладут в кэш то, чего не нашли:
+у locmem каждый процесс прогревает свою копию, общий кэш прогревается
+один раз на всех.
+"""
+import argparse
+import itertools
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+
+from .common import measure, print_table, summary
+
+FRAGMENT = 'x' * 2048
+
+
+def make_cache(kind, directory):
+    from django.core.cache.backends.locmem import LocMemCache
+
+    from core.cache import SQLiteCache
+
+    params = {'TIMEOUT': None, 'OPTIONS': {'MAX_ENTRIES': 10 ** 6}}
+    if kind == 'locmem':
+        return LocMemCache(f'bench-{os.getpid()}', params)
+    return SQLiteCache(os.path.join(directory, 'cache.sqlite3'), params)
+
+
+def operations(kind, directory, repeat):
+    cache = make_cache(kind, directory)
+    counter = itertools.count()
+    cache.set('hit', FRAGMENT)
+    return {
+        'get hit': summary(measure(lambda: cache.get('hit'), repeat)),
+        'get miss': summary(measure(lambda: cache.get('miss'), repeat)),
+        'set': summary(measure(
+            lambda: cache.set(f'key{next(counter)}', FRAGMENT), repeat
+        )),
+        'get_many 10': summary(measure(
+            lambda: cache.get_many([f'key{i}' for i in range(10)]), repeat
+        )),
+    }
+
+
+def worker(args):
+    kind, directory, keys, lookups, seed = args
+    cache = make_cache(kind, directory)
+    rng = random.Random(seed)
+    weights = list(itertools.accumulate(
+        1 / (rank + 1) for rank in range(keys)
+    ))
+    names = [f'fragment{i}' for i in range(keys)]
+    hits = 0
+    start = time.perf_counter()
+    for name in rng.choices(names, cum_weights=weights, k=lookups):
+        if cache.get(name) is None:
+            cache.set(name, FRAGMENT)
+        else:
+            hits += 1
+    return hits, time.perf_counter() - start
+
+
+def shared_load(kind, directory, options):
+    context = multiprocessing.get_context('fork')
+    with context.Pool(options.workers) as pool:
+        results = pool.map(worker, [
+            (kind, directory, options.keys, options.lookups, seed)
+            for seed in range(options.workers)
+        ])
+    hits = sum(hits for hits, _ in results)
+    elapsed = max(elapsed for _, elapsed in results)
+    total = options.lookups * options.workers
+    return {
+        'hit rate, %': hits / total * 100,
+        'lookups/s': total / elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--keys', type=int, default=5000)
+    parser.add_argument('--lookups', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5000)
+    options = parser.parse_args()
+    results = {}
+    for kind in ('locmem', 'sqlite'):
+        directory = tempfile.mkdtemp(prefix='yatube-cache-')
+        try:
+            ops = operations(kind, directory, options.repeat)
+            results[kind] = {
+                f'{name} p50, us': stats['p50'] * 10 ** 6
+                for name, stats in ops.items()
+            }
+            results[kind].update({
+                f'{name} p95, us': stats['p95'] * 10 ** 6
+                for name, stats in ops.items()
+            })
+            shutil.rmtree(directory)
+            directory = tempfile.mkdtemp(prefix='yatube-cache-')
+            results[kind].update(shared_load(kind, directory, options))
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+    print_table(
+        ('metric', 'locmem', 'sqlite'),
+        [
+            (name, f'{results["locmem"][name]:.1f}',
+             f'{results["sqlite"][name]:.1f}')
+            for name in results['locmem']
+        ]
+    )
+
+
+if __name__ == '__main__':
+    main()
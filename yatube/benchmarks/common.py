@@ -0,0 +1,84 @@
+"""Общие помощники бенчмарков: временная база, замеры и отчёт."""
+import os
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+import django
+
+
+def temp_db_name():
+    handle, name = tempfile.mkstemp(
+        prefix='yatube-bench-', suffix='.sqlite3'
+    )
+    os.close(handle)
+    return name
+
+
+def setup_django(db_name=None):
+    """Настраивает Django на временную базу и возвращает путь к ней."""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+    from django.conf import settings
+
+    db_name = db_name or temp_db_name()
+    settings.DATABASES['default']['NAME'] = db_name
+    django.setup()
+    return db_name
+
+
+def use_database(db_name):
+    """Переключает соединение default на другой файл базы."""
+    from django.db import connection
+
+    connection.close()
+    connection.settings_dict['NAME'] = db_name
+
+
+def migrate(*args):
+    from django.core.management import call_command
+
+    call_command('migrate', *args, verbosity=0)
+
+
+@contextmanager
+def timer(results, name):
+    start = time.perf_counter()
+    yield
+    results[name] = time.perf_counter() - start
+
+
+def measure(func, repeat):
+    """Время каждого из repeat вызовов func в секундах."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def percentile(timings, percent):
+    ordered = sorted(timings)
+    index = min(len(ordered) - 1, round(percent / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def summary(timings):
+    return {
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'mean': statistics.mean(timings),
+    }
+
+
+def print_table(header, rows):
+    widths = [
+        max(len(str(row[i])) for row in [header, *rows])
+        for i in range(len(header))
+    ]
+    for row in [header, *rows]:
+        print('  '.join(
+            str(cell).ljust(width) for cell, width in zip(row, widths)
+        ))
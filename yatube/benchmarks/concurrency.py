@@ -0,0 +1,153 @@
+"""Пропускная способность страниц при фиксированном числе воркеров.
+
+    python -m benchmarks.concurrency --clients 16 --requests 400
+
+Один и тот же WSGI-процесс обслуживает запросы сначала одним потоком
+(sync-воркер gunicorn, умолчание gunicorn.conf.py), затем пулом
+потоков (gthread при GUNICORN_THREADS > 1). По умолчанию запросы
+ходят только в настоящие базу и кэш. --latency добавляет к каждому
+запросу искусственное ожидание, например медленного хранилища картинок
+или сетевой базы; цифры с ним описывают этот сценарий, а не текущую
+установку.
+"""
+import argparse
+import os
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from .common import migrate, print_table, setup_django, summary
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class PooledWSGIServer(WSGIServer):
+    """WSGI-сервер, который отдаёт запросы в пул из threads потоков."""
+
+    def __init__(self, address, threads):
+        super().__init__(address, QuietHandler)
+        self.pool = ThreadPoolExecutor(max_workers=threads)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self.process_in_thread, request, client_address)
+
+    def process_in_thread(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown()
+
+
+def with_latency(application, latency):
+    def slow_application(environ, start_response):
+        time.sleep(latency)
+        return application(environ, start_response)
+    return slow_application
+
+
+def seed(options):
+    from posts import counters
+    from posts.models import Group, Post, User
+
+    authors = [
+        User.objects.create_user(username=f'bench_{i}')
+        for i in range(options.authors)
+    ]
+    group = Group.objects.create(
+        title='Группа', slug='bench', description='Бенчмарк'
+    )
+    Post.objects.bulk_create(
+        Post(
+            text=f'Пост {i}',
+            author=authors[i % len(authors)],
+            group=group,
+        )
+        for i in range(options.posts)
+    )
+    counters.recount()
+    post = Post.objects.first()
+    return [
+        '/',
+        f'/group/{group.slug}/',
+        f'/profile/{authors[0].username}/',
+        f'/posts/{post.pk}/',
+    ]
+
+
+def run(options, threads, urls):
+    from django.core.wsgi import get_wsgi_application
+
+    server = PooledWSGIServer(('127.0.0.1', 0), threads)
+    server.set_app(with_latency(get_wsgi_application(), options.latency))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f'http://127.0.0.1:{server.server_port}'
+
+    def fetch(index):
+        start = time.perf_counter()
+        url = base + urls[index % len(urls)]
+        with urllib.request.urlopen(url) as response:
+            response.read()
+        return time.perf_counter() - start
+
+    for index in range(len(urls)):
+        fetch(index)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=options.clients) as clients:
+        timings = list(clients.map(fetch, range(options.requests)))
+    elapsed = time.perf_counter() - start
+    server.shutdown()
+    server.server_close()
+    stats = summary(timings)
+    return {
+        'requests/s': options.requests / elapsed,
+        'p50, ms': stats['p50'] * 1000,
+        'p95, ms': stats['p95'] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0)
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--authors', type=int, default=20)
+    options = parser.parse_args()
+    db_name = setup_django()
+    from django.conf import settings
+
+    settings.DEBUG = False
+    migrate()
+    urls = seed(options)
+    single = run(options, 1, urls)
+    pooled = run(options, options.threads, urls)
+    os.remove(db_name)
+    print_table(
+        ('metric', 'sync', f'gthread x{options.threads}', 'change'),
+        [
+            (
+                name,
+                f'{single[name]:.2f}',
+                f'{pooled[name]:.2f}',
+                f'{(pooled[name] / single[name] - 1) * 100:+.0f}%',
+            )
+            for name in single
+        ]
+    )
+
+
+if __name__ == '__main__':
+    main()
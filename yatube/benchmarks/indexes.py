@@ -0,0 +1,179 @@
+"""Вставка и чтение лент до и после аудита индексов (posts 0012).
+
+    python -m benchmarks.indexes --posts 20000 --repeat 300
+
+«До» — схема миграции 0011 с B-tree индексами по текстовым полям,
+«после» — 0012 с составными индексами под ленты. Каждая схема
+получает свою временную базу с одинаковыми (по seed) данными.
+Данные пишутся историческими моделями из состояния миграции: текущие
+модели знают о полях, которых в старой схеме ещё нет.
+"""
+import argparse
+import os
+import random
+
+from .common import (measure, migrate, print_table, setup_django, summary,
+                     temp_db_name, timer, use_database)
+
+BEFORE = '0011_searchterm'
+AFTER = '0012_index_audit'
+BATCH_SIZE = 500
+WORDS = (
+    'пост лента группа автор подписка комментарий картинка текст '
+    'новости сегодня вечер утро город погода путешествие код'
+).split()
+
+
+def text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def historical_models(target):
+    """Модели posts и auth в состоянии миграции target."""
+    from django.db import connection
+    from django.db.migrations.executor import MigrationExecutor
+
+    state = MigrationExecutor(connection).loader.project_state(
+        ('posts', target)
+    )
+    return {
+        name: state.apps.get_model(app, name)
+        for app, name in (
+            ('auth', 'User'), ('posts', 'Group'), ('posts', 'Post'),
+            ('posts', 'Comment'), ('posts', 'Follow'),
+        )
+    }
+
+
+def seed(options, rng, models):
+    """Заполняет базу и возвращает время вставки постов и комментариев."""
+    from django.db import transaction
+
+    User, Group, Post, Comment, Follow = (
+        models[name] for name in ('User', 'Group', 'Post', 'Comment', 'Follow')
+    )
+    timings = {}
+    User.objects.bulk_create(
+        User(username=f'bench_{i}') for i in range(options.authors)
+    )
+    Group.objects.bulk_create(
+        Group(title=f'Группа {i}', slug=f'group-{i}',
+              description=text(rng, 30))
+        for i in range(options.groups)
+    )
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    group_ids = list(Group.objects.values_list('pk', flat=True))
+    with timer(timings, 'posts'), transaction.atomic():
+        Post.objects.bulk_create(
+            (
+                Post(
+                    text=text(rng, 60),
+                    author_id=rng.choice(user_ids),
+                    group_id=rng.choice(group_ids),
+                )
+                for _ in range(options.posts)
+            ),
+            batch_size=BATCH_SIZE
+        )
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    with timer(timings, 'comments'), transaction.atomic():
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    text=text(rng, 20),
+                    author_id=rng.choice(user_ids),
+                    post_id=rng.choice(post_ids),
+                )
+                for _ in range(options.posts)
+            ),
+            batch_size=BATCH_SIZE
+        )
+    pairs = {
+        (rng.choice(user_ids), rng.choice(user_ids))
+        for _ in range(options.authors * 20)
+    }
+    Follow.objects.bulk_create(
+        (
+            Follow(user_id=user, author_id=author)
+            for user, author in pairs if user != author
+        ),
+        batch_size=BATCH_SIZE
+    )
+    return timings, user_ids, group_ids, post_ids
+
+
+def feed_queries(options, rng, models, user_ids, group_ids, post_ids):
+    Post, Comment, Follow = (
+        models[name] for name in ('Post', 'Comment', 'Follow')
+    )
+    queries = {
+        'author feed': lambda: list(
+            Post.objects.filter(author_id=rng.choice(user_ids))
+            .order_by('-pub_date', '-id')[:10]
+        ),
+        'group feed': lambda: list(
+            Post.objects.filter(group_id=rng.choice(group_ids))
+            .order_by('-pub_date', '-id')[:10]
+        ),
+        'post comments': lambda: list(
+            Comment.objects.filter(post_id=rng.choice(post_ids))
+            .order_by('created')[:10]
+        ),
+        'author followers': lambda: list(
+            Follow.objects.filter(author_id=rng.choice(user_ids))
+            .values_list('user_id', flat=True)
+        ),
+    }
+    return {
+        name: summary(measure(query, options.repeat))
+        for name, query in queries.items()
+    }
+
+
+def run_phase(options, target):
+    db_name = temp_db_name()
+    use_database(db_name)
+    migrate('posts', target)
+    models = historical_models(target)
+    rng = random.Random(options.seed)
+    inserts, *ids = seed(options, rng, models)
+    results = {
+        'posts/s': options.posts / inserts['posts'],
+        'comments/s': options.posts / inserts['comments'],
+        'db size, MB': os.path.getsize(db_name) / 2 ** 20,
+    }
+    for name, stats in feed_queries(options, rng, models, *ids).items():
+        results[f'{name} p50, ms'] = stats['p50'] * 1000
+        results[f'{name} p95, ms'] = stats['p95'] * 1000
+    use_database(':memory:')
+    os.remove(db_name)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--posts', type=int, default=20000)
+    parser.add_argument('--authors', type=int, default=200)
+    parser.add_argument('--groups', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=300)
+    parser.add_argument('--seed', type=int, default=42)
+    options = parser.parse_args()
+    os.remove(setup_django())
+    before = run_phase(options, BEFORE)
+    after = run_phase(options, AFTER)
+    print_table(
+        ('metric', 'before', 'after', 'change'),
+        [
+            (
+                name,
+                f'{before[name]:.2f}',
+                f'{after[name]:.2f}',
+                f'{(after[name] / before[name] - 1) * 100:+.0f}%',
+            )
+            for name in before
+        ]
+    )
+
+
+if __name__ == '__main__':
+    main()
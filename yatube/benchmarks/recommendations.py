@@ -0,0 +1,102 @@
+"""Время расчёта рекомендаций (posts.recommendations) на большом графе.
+
+    python -m benchmarks.recommendations --edges 1000000
+    python -m benchmarks.recommendations --edges 1000000 --db
+
+Граф подписок генерируется сразу в numpy: у каждого читателя около
+--follows-per-user подписок, популярность авторов распределена по Ципфу.
+С --db граф сначала записывается во временную базу, и замеряются
+все три шага команды build_recommendations: чтение рёбер из Follow,
+расчёт и запись Recommendation.
+"""
+import argparse
+import os
+import resource
+
+from .common import migrate, print_table, setup_django, timer
+
+
+def make_graph(edges, follows_per_user, authors, seed):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    users = max(1, edges // follows_per_user)
+    popularity = 1 / np.arange(1, authors + 1)
+    # С запасом: повторы и подписки на себя выбрасываются.
+    sampled = edges * 3 // 2
+    pairs = np.column_stack((
+        rng.integers(1, users + 1, sampled),
+        rng.choice(authors, sampled, p=popularity / popularity.sum()) + 1,
+    ))
+    pairs = np.unique(pairs, axis=0)
+    pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+    return pairs[np.sort(rng.permutation(len(pairs))[:edges])]
+
+
+def fill_database(pairs):
+    from django.db import connection
+
+    users = int(pairs.max())
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            'INSERT INTO auth_user (id, password, is_superuser, username, '
+            'first_name, last_name, email, is_staff, is_active, '
+            "date_joined) VALUES (%s, '', 0, %s, '', '', '', 0, 1, "
+            "'2026-01-01')",
+            ((pk, f'user{pk}') for pk in range(1, users + 1))
+        )
+        cursor.executemany(
+            'INSERT INTO posts_follow (user_id, author_id) VALUES (%s, %s)',
+            pairs.tolist()
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--edges', type=int, default=10 ** 6)
+    parser.add_argument('--follows-per-user', type=int, default=50)
+    parser.add_argument('--authors', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--db', action='store_true')
+    options = parser.parse_args()
+    db_name = setup_django()
+    import numpy as np
+
+    from posts import recommendations
+
+    try:
+        pairs = make_graph(
+            options.edges, options.follows_per_user, options.authors,
+            options.seed
+        )
+        timings = {}
+        if options.db:
+            migrate()
+            fill_database(pairs)
+            with timer(timings, 'load'):
+                pairs, _ = recommendations.load_edges()
+        with timer(timings, 'compute'):
+            result = recommendations.compute(pairs)
+        if options.db:
+            with timer(timings, 'store'):
+                recommendations.store(*result)
+    finally:
+        os.remove(db_name)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print_table(
+        ('metric', 'value'),
+        [
+            ('edges', len(pairs)),
+            ('users', len(np.unique(pairs[:, 0]))),
+            ('recommendations', len(result[0])),
+            *(
+                (f'{name}, s', f'{value:.2f}')
+                for name, value in timings.items()
+            ),
+            ('peak RSS, MB', f'{peak:.0f}'),
+        ]
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+"""Параллельные чтения и записи SQLite: настройки по умолчанию
+против SQLITE_PRAGMAS и постоянных соединений.
+
+    python -m benchmarks.sqlite --readers 6 --writers 2 --duration 10
+
+Процессы-читатели запрашивают страницу главной ленты, процессы-писатели
+создают посты через ORM (с сигналами, лентами и счётчиками).
+«Было» — журнал rollback без прагм и новое соединение на каждую
+операцию (CONN_MAX_AGE = 0), «стало» — WAL, прагмы из настроек
+и одно соединение на процесс.
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from .common import (migrate, print_table, setup_django, summary,
+                     temp_db_name, use_database)
+
+PHASES = ('default', 'tuned')
+
+
+def read(author_id, index):
+    from posts.models import Post
+
+    offset = index % 50
+    list(
+        Post.objects.select_related('author', 'group')
+        .order_by('-pub_date', '-id')[offset:offset + 10]
+    )
+
+
+def write(author_id, index):
+    from posts.models import Post
+
+    Post.objects.create(
+        text=f'Пост под нагрузкой {index}', author_id=author_id
+    )
+
+
+def worker(args):
+    from django.db import OperationalError, connection
+
+    role, phase, duration, author_id = args
+    operation = read if role == 'reader' else write
+    timings = []
+    errors = 0
+    deadline = time.perf_counter() + duration
+    index = 0
+    while time.perf_counter() < deadline:
+        index += 1
+        start = time.perf_counter()
+        try:
+            operation(author_id, index)
+        except OperationalError:
+            errors += 1
+        timings.append(time.perf_counter() - start)
+        if phase == 'default':
+            connection.close()
+    connection.close()
+    return role, timings, errors
+
+
+def run_phase(phase, options):
+    from django.conf import settings
+    from django.db import connections
+
+    from posts.models import Post, User
+
+    default_pragmas = settings.SQLITE_PRAGMAS
+    if phase == 'default':
+        settings.SQLITE_PRAGMAS = {}
+    db_name = temp_db_name()
+    use_database(db_name)
+    migrate()
+    author = User.objects.create_user(username='load_author')
+    Post.objects.bulk_create(
+        Post(text=f'Пост {i}', author=author) for i in range(options.posts)
+    )
+    connections.close_all()
+    tasks = [
+        ('reader', phase, options.duration, author.pk)
+        for _ in range(options.readers)
+    ] + [
+        ('writer', phase, options.duration, author.pk)
+        for _ in range(options.writers)
+    ]
+    context = multiprocessing.get_context('fork')
+    with context.Pool(len(tasks)) as pool:
+        results = pool.map(worker, tasks)
+    settings.SQLITE_PRAGMAS = default_pragmas
+    use_database(':memory:')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_name + suffix):
+            os.remove(db_name + suffix)
+
+    report = {}
+    for role in ('reader', 'writer'):
+        timings = [
+            timing for name, role_timings, _ in results if name == role
+            for timing in role_timings
+        ]
+        stats = summary(timings)
+        report[f'{role}s ops/s'] = len(timings) / options.duration
+        report[f'{role} p50, ms'] = stats['p50'] * 1000
+        report[f'{role} p95, ms'] = stats['p95'] * 1000
+        report[f'{role} p99, ms'] = stats['p99'] * 1000
+        report[f'{role} errors'] = sum(
+            errors for name, _, errors in results if name == role
+        )
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=6)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--posts', type=int, default=2000)
+    options = parser.parse_args()
+    os.remove(setup_django())
+    from django.conf import settings
+
+    settings.DEBUG = False
+    results = {phase: run_phase(phase, options) for phase in PHASES}
+    print_table(
+        ('metric', *PHASES),
+        [
+            (name, *(f'{results[phase][name]:.2f}' for phase in PHASES))
+            for name in results['default']
+        ]
+    )
+
+
+if __name__ == '__main__':
+    main()
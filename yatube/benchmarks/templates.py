@@ -0,0 +1,180 @@
+"""Стоимость рендеринга каждого шаблона templates/posts/.
+
+    python -m benchmarks.templates --scale 0.01 --repeat 200
+    python -m benchmarks.templates --save-baseline
+
+Контекст берётся из настоящих ответов views на данных generate_data;
+фрагменты страниц и карточек в нём не кэшируются, поэтому каждый раз
+рендерится вся страница. Каждый шаблон рендерится движком
+с cached.Loader (как в production) и без него — тогда шаблон и все его
+includes разбираются с диска заново. p95 и число SQL-запросов во время
+рендеринга с cached.Loader сравниваются с записью в baseline.json,
+как в benchmarks.views.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+
+from .common import measure, migrate, print_table, setup_django, summary
+from .views import BASELINE, SEARCH_QUERY, compare, load_baseline, sample
+
+PAGES = {
+    'posts/index.html': ('index', {}),
+    'posts/follow.html': ('follow_index', {}),
+    'posts/group_list.html': ('group_list', {'slug'}),
+    'posts/profile.html': ('profile', {'username'}),
+    'posts/post_detail.html': ('post_detail', {'post_id'}),
+    'posts/create_post.html': ('post_create', {}),
+    'posts/search.html': ('search', {}),
+}
+
+
+def engines():
+    from django.conf import settings
+
+    from core.backends import InstrumentedDjangoTemplates
+
+    config = settings.TEMPLATES[0]
+    loaders = settings.TEMPLATE_LOADERS
+    return {
+        name: InstrumentedDjangoTemplates({
+            'NAME': f'bench-{name}',
+            'DIRS': config['DIRS'],
+            'APP_DIRS': False,
+            'OPTIONS': {**config['OPTIONS'], 'loaders': loaders},
+        })
+        for name, loaders in (
+            ('cached', [('django.template.loaders.cached.Loader', loaders)]),
+            ('uncached', loaders),
+        )
+    }
+
+
+def top_context(response):
+    """Контекст шаблона страницы, без контекстов её includes."""
+    from django.test.utils import ContextList
+
+    context = response.context
+    if isinstance(context, ContextList):
+        context = context[0]
+    return context.flatten()
+
+
+def page_contexts():
+    """(шаблон, контекст, запрос) для страниц и includes."""
+    from django.test import Client
+    from django.test.utils import (setup_test_environment,
+                                   teardown_test_environment)
+    from django.urls import reverse
+
+    viewer, kwargs = sample()
+    client = Client()
+    client.force_login(viewer)
+    setup_test_environment()
+    try:
+        contexts = {}
+        for template, (name, args) in PAGES.items():
+            params = {'q': SEARCH_QUERY} if name == 'search' else {}
+            response = client.get(
+                reverse(
+                    f'posts:{name}',
+                    kwargs={arg: kwargs[arg] for arg in args}
+                ),
+                params
+            )
+            context = top_context(response)
+            if 'feed_cache' in context:
+                context['feed_cache'] = {'key': 'bench', 'timeout': 0}
+            context['card_cache'] = None
+            contexts[template] = (context, response.wsgi_request)
+    finally:
+        teardown_test_environment()
+    context, request = contexts['posts/index.html']
+    post = context['page_obj'][0]
+    for template in (
+        'posts/includes/post_list.html',
+        'posts/includes/post_image.html',
+        'posts/includes/switcher.html',
+    ):
+        contexts[template] = ({**context, 'post': post}, request)
+    context, request = contexts['posts/follow.html']
+    contexts['posts/includes/recommendations.html'] = (context, request)
+    return contexts
+
+
+def run_templates(options):
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    contexts = page_contexts()
+    results = {}
+    for kind, engine in engines().items():
+        for template, (context, request) in contexts.items():
+            def render():
+                engine.get_template(template).render(context, request)
+
+            with CaptureQueriesContext(connection) as captured:
+                render()
+            stats = summary(measure(render, options.repeat))
+            stats['queries'] = len(captured)
+            results.setdefault(template, {})[kind] = stats
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--tolerance', type=float, default=25)
+    parser.add_argument('--save-baseline', action='store_true')
+    options = parser.parse_args()
+    db_name = setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.DEBUG = False
+    migrate()
+    call_command(
+        'generate_data', scale=options.scale, seed=options.seed,
+        stdout=io.StringIO()
+    )
+    results = run_templates(options)
+    os.remove(db_name)
+
+    key = f'templates scale={options.scale}'
+    current = {
+        template: {
+            'p50': stats['cached']['p50'] * 1000,
+            'p95': stats['cached']['p95'] * 1000,
+            'p99': stats['cached']['p99'] * 1000,
+            'queries': stats['cached']['queries'],
+        }
+        for template, stats in results.items()
+    }
+    baselines = load_baseline()
+    rows, regressed = compare(
+        current, baselines.get(key, {}), options.tolerance
+    )
+    print_table(
+        ('template', 'p50, ms', 'p95, ms', 'p99, ms', 'queries',
+         'base p95', 'base queries', 'p95 change', 'uncached p50, ms'),
+        [
+            (*row, f'{results[row[0]]["uncached"]["p50"] * 1000:.2f}')
+            for row in rows
+        ]
+    )
+    if options.save_baseline:
+        baselines[key] = current
+        with open(BASELINE, 'w', encoding='utf-8') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'Baseline «{key}» сохранён в {BASELINE}')
+    elif regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,194 @@
+"""Задержка и число SQL-запросов всех страниц posts на синтетических данных.
+
+    python -m benchmarks.views --scale 0.01 --repeat 50
+    python -m benchmarks.views --scale 0.01 --save-baseline
+
+Данные создаёт manage.py generate_data во временной базе. Каждый URL
+из posts/urls.py запрашивается тестовым клиентом от имени читателя
+с самым большим числом подписок. Результат сравнивается с записью
+того же масштаба в baseline.json: если p95 вырос больше --tolerance
+процентов или запросов стало больше, команда завершается с кодом 1.
+
+С --stale-pages кэш не сбрасывается, но перед каждым запросом меняются
+поколения лент: страницы перерисовываются, а карточки постов
+берутся из своего кэша, как после публикации нового поста.
+"""
+import argparse
+import io
+import json
+import os
+import sys
+import time
+
+from .common import migrate, print_table, setup_django, summary
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SEARCH_QUERY = 'путешествие'
+
+
+def sample():
+    """Читатель и аргументы URL: популярный автор, группа, пост."""
+    from django.db.models import Count
+
+    from posts.models import Group, Post, User
+
+    viewer = User.objects.annotate(
+        follows=Count('follower')
+    ).order_by('-follows', 'pk').first()
+    author = User.objects.annotate(
+        followers=Count('following')
+    ).order_by('-followers', 'pk').first()
+    post = (
+        Post.objects.filter(author=viewer).order_by('-comments_count').first()
+        or Post.objects.order_by('-comments_count').first()
+    )
+    group = Group.objects.order_by('-posts_count').first()
+    return viewer, {
+        'slug': group.slug,
+        'username': author.username,
+        'post_id': post.pk,
+    }
+
+
+def page_feeds(viewer, kwargs):
+    from posts import caching
+    from posts.models import Group, User
+
+    return (
+        (caching.GLOBAL, None),
+        (caching.GROUP, Group.objects.get(slug=kwargs['slug']).pk),
+        (caching.AUTHOR, User.objects.get(username=kwargs['username']).pk),
+        (caching.FOLLOWER, viewer.pk),
+    )
+
+
+def run_views(options):
+    from django.core.cache import cache
+    from django.db import connection
+    from django.test import Client
+    from django.test.utils import CaptureQueriesContext
+    from django.urls import reverse
+
+    from posts import caching
+    from posts.urls import urlpatterns
+
+    viewer, kwargs = sample()
+    feeds = page_feeds(viewer, kwargs)
+    client = Client()
+    client.force_login(viewer)
+    results = {}
+    for pattern in urlpatterns:
+        url = reverse(
+            f'posts:{pattern.name}',
+            kwargs={name: kwargs[name] for name in pattern.pattern.converters}
+        )
+        params = {'q': SEARCH_QUERY} if pattern.name == 'search' else {}
+        timings = []
+        queries = 0
+        for _ in range(options.repeat):
+            if options.stale_pages:
+                caching.bump(*feeds)
+            elif not options.warm:
+                cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                client.get(url, params)
+                timings.append(time.perf_counter() - start)
+            queries = max(queries, len(captured))
+        stats = summary(timings)
+        results[pattern.name] = {
+            'p50': stats['p50'] * 1000,
+            'p95': stats['p95'] * 1000,
+            'p99': stats['p99'] * 1000,
+            'queries': queries,
+        }
+    return results
+
+
+def load_baseline():
+    if not os.path.exists(BASELINE):
+        return {}
+    with open(BASELINE, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def compare(results, baseline, tolerance):
+    """Строки отчёта и признак регрессии относительно baseline."""
+    rows = []
+    regressed = False
+    for name, stats in results.items():
+        base = baseline.get(name)
+        change = ''
+        if base:
+            ratio = stats['p95'] / base['p95'] - 1
+            change = f'{ratio * 100:+.0f}%'
+            if ratio * 100 > tolerance or stats['queries'] > base['queries']:
+                change += ' !'
+                regressed = True
+        rows.append((
+            name,
+            f'{stats["p50"]:.1f}',
+            f'{stats["p95"]:.1f}',
+            f'{stats["p99"]:.1f}',
+            stats['queries'],
+            f'{base["p95"]:.1f}' if base else '-',
+            base['queries'] if base else '-',
+            change,
+        ))
+    return rows, regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--scale', type=float, default=0.01)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument(
+        '--warm', action='store_true',
+        help='Не сбрасывать кэш между запросами.'
+    )
+    parser.add_argument(
+        '--stale-pages', action='store_true',
+        help='Сбрасывать только фрагменты страниц, а не карточек.'
+    )
+    parser.add_argument('--tolerance', type=float, default=25)
+    parser.add_argument('--save-baseline', action='store_true')
+    options = parser.parse_args()
+    db_name = setup_django()
+    from django.conf import settings
+    from django.core.management import call_command
+
+    settings.DEBUG = False
+    migrate()
+    call_command(
+        'generate_data', scale=options.scale, seed=options.seed,
+        stdout=io.StringIO()
+    )
+    results = run_views(options)
+    os.remove(db_name)
+
+    key = f'scale={options.scale}' + (
+        ' stale-pages' if options.stale_pages
+        else ' warm' if options.warm else ''
+    )
+    baselines = load_baseline()
+    rows, regressed = compare(
+        results, baselines.get(key, {}), options.tolerance
+    )
+    print_table(
+        ('view', 'p50, ms', 'p95, ms', 'p99, ms', 'queries',
+         'base p95', 'base queries', 'p95 change'),
+        rows
+    )
+    if options.save_baseline:
+        baselines[key] = results
+        with open(BASELINE, 'w', encoding='utf-8') as file:
+            json.dump(baselines, file, indent=2, sort_keys=True)
+            file.write('\n')
+        print(f'Baseline «{key}» сохранён в {BASELINE}')
+    elif regressed:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Кэш- и шаблонный бэкенды, которые пишут время и попадания
+в метрики текущего запроса (core.metrics)."""
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.template.backends.django import DjangoTemplates, Template
+
+from . import metrics
+from .cache import SQLiteCache
+
+_MISSING = object()
+
+
+class InstrumentedCacheMixin:
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        request_metrics = metrics.current()
+        if request_metrics is not None:
+            if value is _MISSING:
+                request_metrics.cache_misses += 1
+            else:
+                request_metrics.cache_hits += 1
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        values = super().get_many(keys, version)
+        request_metrics = metrics.current()
+        if request_metrics is not None:
+            request_metrics.cache_hits += len(values)
+            request_metrics.cache_misses += len(keys) - len(values)
+        return values
+
+
+class InstrumentedLocMemCache(InstrumentedCacheMixin, LocMemCache):
+    pass
+
+
+class InstrumentedSQLiteCache(InstrumentedCacheMixin, SQLiteCache):
+    pass
+
+
+class InstrumentedTemplate(Template):
+    def render(self, context=None, request=None):
+        request_metrics = metrics.current()
+        if request_metrics is None:
+            return super().render(context, request)
+        start = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            request_metrics.template_time += time.perf_counter() - start
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    """DjangoTemplates, который учитывает время рендеринга шаблонов.
+
+    Подключённые через include и extends шаблоны рендерятся внутри
+    верхнего, поэтому время не считается дважды.
+    """
+
+    def from_string(self, template_code):
+        return InstrumentedTemplate(
+            self.engine.from_string(template_code), self
+        )
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return InstrumentedTemplate(template.template, self)
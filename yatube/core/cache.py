@@ -0,0 +1,301 @@
+"""Общий для всех процессов кэш в файле SQLite.
+
+LocMemCache у каждого воркера gunicorn свой: фрагменты лент и записи
+sorl-thumbnail дублируются, а смена поколения ленты не доходит
+до соседних процессов. SQLiteCache хранит всё в одном файле
+(удобно положить его в /dev/shm), читает через mmap и не требует
+отдельного сервиса.
+
+Вытеснение — LRU. Чтение не пишет в файл: время последнего чтения
+копится в памяти потока (не чаще ACCESS_RESOLUTION секунд на ключ)
+и записывается пачкой вместе с ближайшей записью в кэш или раз
+в ACCESS_FLUSH_INTERVAL секунд, если файл не занят. Чтение ждёт
+блокировку не дольше READ_TIMEOUT, а занятый файл считает промахом;
+записи ждут до WRITE_TIMEOUT.
+Лимиты — MAX_ENTRIES (число ключей) и MAX_SIZE (байты значений);
+при превышении удаляются просроченные, затем самые давние ключи,
+пока не освободится 1/CULL_FREQUENCY лимита.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+ACCESS_RESOLUTION = 1.0
+ACCESS_FLUSH_INTERVAL = 10.0
+MAX_PENDING_ACCESSES = 1000
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS cache (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    expires REAL,
+    accessed REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed);
+CREATE TABLE IF NOT EXISTS cache_stats (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    entries INTEGER NOT NULL,
+    bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_stats VALUES (1, 0, 0);
+CREATE TRIGGER IF NOT EXISTS cache_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_stats
+    SET entries = entries + 1, bytes = bytes + NEW.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_stats
+    SET entries = entries - 1, bytes = bytes - OLD.size;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_update AFTER UPDATE OF size ON cache
+BEGIN
+    UPDATE cache_stats SET bytes = bytes - OLD.size + NEW.size;
+END;
+'''
+
+
+@contextmanager
+def _transaction(connection):
+    """BEGIN IMMEDIATE ... COMMIT на соединении в режиме autocommit."""
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        yield
+    except BaseException:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def _is_busy(error):
+    message = str(error)
+    return 'locked' in message or 'busy' in message
+
+
+class SQLiteCache(BaseCache):
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get('OPTIONS', {})
+        self._max_size = int(options.get('MAX_SIZE', 64 * 2 ** 20))
+        self._mmap_size = int(options.get('MMAP_SIZE', self._max_size * 2))
+        self._read_timeout = int(
+            float(options.get('READ_TIMEOUT', 0.05)) * 1000
+        )
+        self._write_timeout = int(
+            float(options.get('WRITE_TIMEOUT', 2)) * 1000
+        )
+        self._local = threading.local()
+
+    def _connection(self):
+        """Своё соединение на каждый поток и процесс (после fork)."""
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self._path, timeout=self._write_timeout / 1000,
+                isolation_level=None, check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = OFF')
+            connection.execute('PRAGMA recursive_triggers = ON')
+            connection.execute(f'PRAGMA mmap_size = {self._mmap_size}')
+            connection.executescript(SCHEMA)
+            connection.execute(f'PRAGMA busy_timeout = {self._read_timeout}')
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+            self._local.accessed = {}
+            self._local.flushed = time.time()
+        return connection
+
+    @contextmanager
+    def _writing(self):
+        """Транзакция записи с ожиданием блокировки до WRITE_TIMEOUT."""
+        connection = self._connection()
+        connection.execute(f'PRAGMA busy_timeout = {self._write_timeout}')
+        try:
+            with _transaction(connection):
+                self._flush_accesses(connection)
+                yield connection
+        finally:
+            connection.execute(f'PRAGMA busy_timeout = {self._read_timeout}')
+
+    def _flush_accesses(self, connection):
+        accessed = self._local.accessed
+        if accessed:
+            connection.executemany(
+                'UPDATE cache SET accessed = ? WHERE key = ?',
+                [(when, key) for key, when in accessed.items()]
+            )
+            accessed.clear()
+        self._local.flushed = time.time()
+
+    def _note_accesses(self, connection, keys, now):
+        accessed = self._local.accessed
+        accessed.update(dict.fromkeys(keys, now))
+        if (
+            now - self._local.flushed < ACCESS_FLUSH_INTERVAL
+            and len(accessed) < MAX_PENDING_ACCESSES
+        ):
+            return
+        try:
+            with _transaction(connection):
+                self._flush_accesses(connection)
+        except sqlite3.OperationalError as error:
+            if not _is_busy(error):
+                raise
+            # Файл занят: попробуем в следующий раз, но память не копим.
+            if len(accessed) >= MAX_PENDING_ACCESSES:
+                accessed.clear()
+            self._local.flushed = now
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    def _read(self, connection, keys):
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        try:
+            rows = connection.execute(
+                f'SELECT key, value, expires, accessed FROM cache '
+                f'WHERE key IN ({placeholders})',
+                keys
+            ).fetchall()
+        except sqlite3.OperationalError as error:
+            if not _is_busy(error):
+                raise
+            return {}
+        found = {}
+        stale = []
+        for key, value, expires, accessed in rows:
+            if expires is not None and expires <= now:
+                continue
+            found[key] = pickle.loads(value)
+            if accessed < now - ACCESS_RESOLUTION:
+                stale.append(key)
+        if stale:
+            self._note_accesses(connection, stale, now)
+        return found
+
+    def _write(self, connection, key, value, timeout, replace=True):
+        data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT OR IGNORE'
+        cursor = connection.execute(
+            f'{verb} INTO cache (key, value, size, expires, accessed) '
+            f'VALUES (?, ?, ?, ?, ?)',
+            (key, data, len(data), self._expires(timeout), time.time())
+        )
+        return cursor.rowcount > 0
+
+    def _stats(self, connection):
+        return connection.execute(
+            'SELECT entries, bytes FROM cache_stats'
+        ).fetchone()
+
+    def _cull(self, connection):
+        entries, size = self._stats(connection)
+        if entries <= self._max_entries and size <= self._max_size:
+            return
+        connection.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        keep = 1 - 1 / self._cull_frequency if self._cull_frequency else 0
+        entries, size = self._stats(connection)
+        if entries > self._max_entries:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed, key LIMIT ?)',
+                (entries - int(self._max_entries * keep),)
+            )
+            entries, size = self._stats(connection)
+        if size > self._max_size:
+            connection.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM (SELECT key, size, SUM(size) OVER '
+                '(ORDER BY accessed, key) AS running FROM cache) '
+                'WHERE running - size < ?)',
+                (size - int(self._max_size * keep),)
+            )
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._read(self._connection(), [key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        found = self._read(self._connection(), list(keys))
+        return {keys[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._writing() as connection:
+            self._write(connection, key, value, timeout)
+            self._cull(connection)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        with self._writing() as connection:
+            for key, value in data.items():
+                self._write(
+                    connection, self._key(key, version), value, timeout
+                )
+            self._cull(connection)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._writing() as connection:
+            connection.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, time.time())
+            )
+            added = self._write(
+                connection, key, value, timeout, replace=False
+            )
+            self._cull(connection)
+        return added
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        with self._writing() as connection:
+            cursor = connection.execute(
+                'UPDATE cache SET expires = ? '
+                'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self._expires(timeout), key, time.time())
+            )
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self._key(key, version)
+        with self._writing() as connection:
+            connection.execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if keys:
+            placeholders = ', '.join('?' * len(keys))
+            with self._writing() as connection:
+                connection.execute(
+                    f'DELETE FROM cache WHERE key IN ({placeholders})', keys
+                )
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._read(self._connection(), [key])
+
+    def clear(self):
+        with self._writing() as connection:
+            connection.execute('DELETE FROM cache')
+
+    def close(self, **kwargs):
+        # Соединения держатся на поток между запросами.
+        pass
@@ -0,0 +1,43 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в файлы реплик из '
+        'DATABASE_REPLICAS через online backup API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            help='Повторять копирование каждые N секунд.'
+        )
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('DATABASE_REPLICAS пуст.')
+        source_name = connections[DEFAULT_DB_ALIAS].settings_dict['NAME']
+        while True:
+            source = sqlite3.connect(source_name)
+            try:
+                for alias in settings.DATABASE_REPLICAS:
+                    target = sqlite3.connect(
+                        connections[alias].settings_dict['NAME']
+                    )
+                    with target:
+                        source.backup(target)
+                    target.close()
+            finally:
+                source.close()
+            self.stdout.write(self.style.SUCCESS(
+                f'Реплики обновлены: {", ".join(settings.DATABASE_REPLICAS)}'
+            ))
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
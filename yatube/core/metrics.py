@@ -0,0 +1,168 @@
+"""Метрики запросов: счётчики текущего запроса и гистограммы по view.
+
+Счётчики текущего запроса живут в threading.local, их заполняют
+обёртка SQL из MetricsMiddleware, шаблонный и кэш-бэкенды
+из core.backends. Гистограммы копятся в памяти процесса и отдаются
+в текстовом формате Prometheus; каждый воркер gunicorn отдаёт свои.
+"""
+import bisect
+import threading
+import time
+
+SECONDS_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5
+)
+QUERIES_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+BYTES_BUCKETS = tuple(2 ** power for power in range(8, 22, 2))
+
+_state = threading.local()
+
+
+class RequestMetrics:
+    __slots__ = (
+        'start', 'queries', 'db_time', 'template_time',
+        'cache_hits', 'cache_misses'
+    )
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def server_timing(self, total):
+        return ', '.join((
+            f'db;dur={self.db_time * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template_time * 1000:.1f}',
+            f'cache;desc="{self.cache_hits} hits, '
+            f'{self.cache_misses} misses"',
+            f'total;dur={total * 1000:.1f}',
+        ))
+
+
+def start():
+    _state.current = RequestMetrics()
+    return _state.current
+
+
+def stop():
+    _state.current = None
+
+
+def current():
+    """Метрики запроса этого потока или None вне запроса."""
+    return getattr(_state, 'current', None)
+
+
+class Histogram:
+    def __init__(self, name, help_text, buckets):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, view, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            series = self.series.get(view)
+            if series is None:
+                series = self.series[view] = [
+                    [0] * (len(self.buckets) + 1), 0.0
+                ]
+            series[0][index] += 1
+            series[1] += value
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} histogram',
+        ]
+        with self.lock:
+            series = {
+                view: (list(counts), total)
+                for view, (counts, total) in self.series.items()
+            }
+        for view, (counts, total) in sorted(series.items()):
+            label = f'view="{view}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(
+                    f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}'
+                )
+            cumulative += counts[-1]
+            lines.append(
+                f'{self.name}_bucket{{{label},le="+Inf"}} {cumulative}'
+            )
+            lines.append(f'{self.name}_sum{{{label}}} {total}')
+            lines.append(f'{self.name}_count{{{label}}} {cumulative}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help_text = help_text
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def inc(self, view, value):
+        with self.lock:
+            self.series[view] = self.series.get(view, 0) + value
+
+    def render(self):
+        lines = [
+            f'# HELP {self.name} {self.help_text}',
+            f'# TYPE {self.name} counter',
+        ]
+        with self.lock:
+            series = dict(self.series)
+        lines.extend(
+            f'{self.name}{{view="{view}"}} {value}'
+            for view, value in sorted(series.items())
+        )
+        return lines
+
+
+REQUEST_SECONDS = Histogram(
+    'yatube_request_seconds', 'Время ответа.', SECONDS_BUCKETS
+)
+DB_SECONDS = Histogram(
+    'yatube_db_seconds', 'Время SQL-запросов за ответ.', SECONDS_BUCKETS
+)
+DB_QUERIES = Histogram(
+    'yatube_db_queries', 'Число SQL-запросов за ответ.', QUERIES_BUCKETS
+)
+TEMPLATE_SECONDS = Histogram(
+    'yatube_template_seconds', 'Время рендеринга шаблонов.', SECONDS_BUCKETS
+)
+RESPONSE_BYTES = Histogram(
+    'yatube_response_bytes', 'Размер тела ответа.', BYTES_BUCKETS
+)
+CACHE_HITS = Counter('yatube_cache_hits_total', 'Попадания в кэш.')
+CACHE_MISSES = Counter('yatube_cache_misses_total', 'Промахи кэша.')
+METRICS = (
+    REQUEST_SECONDS, DB_SECONDS, DB_QUERIES, TEMPLATE_SECONDS,
+    RESPONSE_BYTES, CACHE_HITS, CACHE_MISSES,
+)
+
+
+def record(view, metrics, total, size):
+    REQUEST_SECONDS.observe(view, total)
+    DB_SECONDS.observe(view, metrics.db_time)
+    DB_QUERIES.observe(view, metrics.queries)
+    TEMPLATE_SECONDS.observe(view, metrics.template_time)
+    if size is not None:
+        RESPONSE_BYTES.observe(view, size)
+    CACHE_HITS.inc(view, metrics.cache_hits)
+    CACHE_MISSES.inc(view, metrics.cache_misses)
+
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,151 @@
+import mimetypes
+import os
+import posixpath
+import time
+from contextlib import ExitStack
+from urllib.parse import unquote
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.db import connections
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from . import metrics
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _timed_execute(execute, sql, params, many, context):
+    request_metrics = metrics.current()
+    if request_metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        request_metrics.db_time += time.perf_counter() - start
+        request_metrics.queries += 1
+
+
+class MetricsMiddleware:
+    """Считает SQL, шаблоны, кэш и размер ответа для каждого запроса.
+
+    Итог уходит в заголовок Server-Timing и в гистограммы по имени
+    view, которые отдаёт /metrics/. Стоит в MIDDLEWARE сразу после
+    StaticFilesMiddleware, чтобы учитывать и запросы сессий
+    и аутентификации.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request_metrics = metrics.start()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(_timed_execute)
+                    )
+                response = self.get_response(request)
+        finally:
+            metrics.stop()
+        total = time.perf_counter() - request_metrics.start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        size = None if response.streaming else len(response.content)
+        metrics.record(view, request_metrics, total, size)
+        response['Server-Timing'] = request_metrics.server_timing(total)
+        return response
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, кроме запрещённых через q=0."""
+    accepted = set()
+    for part in header.split(','):
+        encoding, _, params = part.partition(';')
+        name, _, value = params.strip().partition('=')
+        if name.strip() == 'q':
+            try:
+                if float(value) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(encoding.strip().lower())
+    return accepted
+
+
+class StaticFilesMiddleware:
+    """Отдаёт файлы из STATIC_ROOT, не доходя до сессий и view.
+
+    Берёт сжатую при collectstatic копию (.br, .gz), если браузер её
+    понимает. Файлы с хешем в имени из манифеста
+    ManifestStaticFilesStorage кэшируются браузером навсегда,
+    остальные — на STATIC_MAX_AGE секунд с проверкой по ETag.
+    Стоит первым в MIDDLEWARE.
+    """
+
+    def __init__(self, get_response):
+        if not settings.STATIC_ROOT or not settings.STATIC_URL.startswith('/'):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.prefix = settings.STATIC_URL
+        self.root = settings.STATIC_ROOT
+        self.immutable = set(
+            getattr(staticfiles_storage, 'hashed_files', {}).values()
+        )
+
+    def __call__(self, request):
+        if (
+            request.method in ('GET', 'HEAD')
+            and request.path_info.startswith(self.prefix)
+        ):
+            response = self.serve(
+                request, request.path_info[len(self.prefix):]
+            )
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def serve(self, request, name):
+        name = posixpath.normpath(unquote(name)).lstrip('/')
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            return None
+        accepted = accepted_encodings(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        encoding, served = None, path
+        for candidate, suffix in ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                encoding, served = candidate, path + suffix
+                break
+        stat = os.stat(served)
+        etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(stat.st_mtime)
+        )
+        if response is None:
+            response = FileResponse(open(served, 'rb'))
+            content_type, _ = mimetypes.guess_type(name)
+            response['Content-Type'] = (
+                content_type or 'application/octet-stream'
+            )
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = (
+            IMMUTABLE if name in self.immutable
+            else f'public, max-age={settings.STATIC_MAX_AGE}'
+        )
+        return response
@@ -0,0 +1,85 @@
+"""Чтение с реплик с гарантией read-your-writes.
+
+ReplicaRouter отправляет чтения на случайную реплику из
+DATABASE_REPLICAS только внутри GET- и HEAD-запроса, который пропустил
+ReplicaPinningMiddleware. Всё остальное идёт в default: записи,
+чтения формы перед записью (POST), чтения внутри транзакции, сессии,
+management-команды и фоновые потоки.
+
+Запрос, который что-то записал, до конца читает из default,
+а ответ ставит cookie: следующие REPLICA_PIN_SECONDS секунд
+(например, после редиректа из post_create) этот пользователь тоже
+читает из default, пока реплики догоняют основную базу.
+"""
+import random
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'pin_primary'
+PRIMARY_APPS = {'sessions'}
+REPLICA_METHODS = {'GET', 'HEAD'}
+
+_state = threading.local()
+
+
+def reads_from_replicas():
+    """Могут ли чтения текущего потока сейчас уйти на реплику."""
+    return bool(
+        settings.DATABASE_REPLICAS
+        and getattr(_state, 'use_replicas', False)
+        and not _state.wrote
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (
+            not replicas
+            or not getattr(_state, 'use_replicas', False)
+            or _state.wrote
+            or model._meta.app_label in PRIMARY_APPS
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        _state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+
+class ReplicaPinningMiddleware:
+    """Включает чтение с реплик на время запроса и закрепляет
+    пользователя за default после записи."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # POST читает то, что тут же перезапишет: строка с отстающей
+        # реплики затёрла бы свежие значения в default.
+        _state.use_replicas = (
+            request.method in REPLICA_METHODS
+            and PIN_COOKIE not in request.COOKIES
+        )
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = _state.wrote
+            _state.use_replicas = False
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS, httponly=True
+            )
+        return response
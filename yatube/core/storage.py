@@ -0,0 +1,59 @@
+"""Хранилище статики с хешами в именах и заранее сжатыми копиями.
+
+collectstatic кладёт в STATIC_ROOT файлы с хешем содержимого в имени,
+а рядом с текстовыми — их gzip- и brotli-версии (.gz, .br), поэтому
+сжимать на лету ничего не нужно. core.middleware.StaticFilesMiddleware
+выбирает версию по Accept-Encoding. brotli — необязательная
+зависимость: без неё собираются только .gz.
+"""
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = (
+    '.css', '.js', '.map', '.svg', '.txt', '.html', '.json', '.xml', '.ico',
+)
+MIN_SIZE = 256
+# Сжатая копия, которая экономит меньше 5%, не стоит отдельного файла.
+MIN_RATIO = 0.95
+
+
+def compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', brotli.compress
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        for name in paths:
+            if not name.endswith(COMPRESSIBLE):
+                continue
+            for target in {name, self.stored_name(name)}:
+                for compressed in self.compress(target):
+                    yield target, compressed, True
+
+    def compress(self, name):
+        """Сохраняет сжатые копии файла и возвращает их имена."""
+        with self.open(name) as file:
+            data = file.read()
+        if len(data) < MIN_SIZE:
+            return
+        for suffix, compress in compressors():
+            compressed = compress(data)
+            if len(compressed) > len(data) * MIN_RATIO:
+                continue
+            target = name + suffix
+            if self.exists(target):
+                self.delete(target)
+            self._save(target, ContentFile(compressed))
+            yield target
@@ -1,6 +1,29 @@
+import os
+import shutil
+import tempfile
+import time
 from http import HTTPStatus
+from unittest import mock
 
-from django.test import TestCase
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.http import HttpResponse
+from django.template import engines
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import storage
+from core.cache import SQLiteCache
+from core.middleware import accepted_encodings
+from core.routers import (PIN_COOKIE, ReplicaPinningMiddleware,
+                          ReplicaRouter)
+from core.warmup import template_names, warm_templates
+from posts import caching, follow_graph
+from posts.models import Follow, Post, User
 
 
 class ViewTestClass(TestCase):
@@ -8,3 +31,462 @@ class ViewTestClass(TestCase):
         response = self.client.get('/nonexist-page/')
         self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
         self.assertTemplateUsed(response, 'core/404.html')
+
+
+class SQLitePragmasTests(TestCase):
+    def test_connection_is_tuned(self):
+        expected = {'synchronous': 1, 'busy_timeout': 5000, 'temp_store': 2}
+        with connection.cursor() as cursor:
+            for name, value in expected.items():
+                with self.subTest(pragma=name):
+                    cursor.execute(f'PRAGMA {name}')
+                    self.assertEqual(cursor.fetchone()[0], value)
+
+
+class MetricsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_header(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'total;dur='):
+            with self.subTest(metric=metric):
+                self.assertIn(metric, timing)
+        self.assertRegex(timing, r'cache;desc="[1-9]\d* hits')
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint(self):
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        body = response.content.decode()
+        for name in (
+            'yatube_request_seconds_bucket{view="posts:index",le="+Inf"}',
+            'yatube_db_queries_count{view="posts:index"}',
+            'yatube_template_seconds_sum{view="posts:index"}',
+            'yatube_response_bytes_count{view="posts:index"}',
+            'yatube_cache_misses_total{view="posts:index"}',
+        ):
+            with self.subTest(name=name):
+                self.assertIn(name, body)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_metrics_endpoint_requires_token(self):
+        for headers in (
+            {},
+            {'REMOTE_ADDR': '127.0.0.1'},
+            {'HTTP_AUTHORIZATION': 'Bearer wrong'},
+        ):
+            with self.subTest(headers=headers):
+                response = self.client.get(reverse('metrics'), **headers)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.FORBIDDEN
+                )
+
+    def test_metrics_endpoint_closed_without_token(self):
+        response = self.client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer '
+        )
+        self.assertEqual(response.status_code, HTTPStatus.FORBIDDEN)
+
+
+class SQLiteCacheTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SQLiteCache(self.path, {'OPTIONS': options})
+
+    def test_basic_operations(self):
+        self.cache.set('key', {'value': 1})
+        self.assertEqual(self.cache.get('key'), {'value': 1})
+        self.assertFalse(self.cache.add('key', 'other'))
+        self.assertTrue(self.cache.add('new', 'value'))
+        self.cache.set_many({'a': 1, 'b': 2})
+        self.assertEqual(
+            self.cache.get_many(['a', 'b', 'missing']), {'a': 1, 'b': 2}
+        )
+        self.cache.delete_many(['a', 'key'])
+        self.assertIsNone(self.cache.get('key'))
+        self.assertEqual(self.cache.get('a', 'default'), 'default')
+        self.assertTrue(self.cache.has_key('b'))
+        self.cache.clear()
+        self.assertFalse(self.cache.has_key('b'))
+
+    def test_expired_keys_are_missing(self):
+        self.cache.set('key', 'value', timeout=0.1)
+        time.sleep(0.2)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'fresh'))
+        self.assertEqual(self.cache.get('key'), 'fresh')
+
+    def test_shared_between_instances(self):
+        self.cache.set('key', 'value')
+        other = self.make_cache()
+        self.assertEqual(other.get('key'), 'value')
+        other.delete('key')
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_lru_eviction_by_entries(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        for i in range(4):
+            cache.set(f'key{i}', i)
+        cache._connection().execute(
+            "UPDATE cache SET accessed = 0 WHERE key != ':1:key0'"
+        )
+        cache.set('key4', 4)
+        self.assertEqual(
+            sorted(cache.get_many([f'key{i}' for i in range(5)])),
+            ['key0', 'key4']
+        )
+
+    def accessed(self, key):
+        return self.cache._connection().execute(
+            'SELECT accessed FROM cache WHERE key = ?', (f':1:{key}',)
+        ).fetchone()[0]
+
+    def test_reads_do_not_write_until_next_write(self):
+        self.cache.set('key', 'value')
+        self.cache._connection().execute('UPDATE cache SET accessed = 0')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertEqual(self.accessed('key'), 0)
+        self.cache.set('other', 'value')
+        self.assertGreater(self.accessed('key'), 0)
+
+    def test_locked_file_does_not_stall_reads(self):
+        self.cache.set('key', 'value')
+        self.cache._connection().execute('UPDATE cache SET accessed = 0')
+        writer = self.make_cache()
+        connection = writer._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            start = time.monotonic()
+            with mock.patch('core.cache.ACCESS_FLUSH_INTERVAL', 0):
+                self.assertEqual(self.cache.get('key'), 'value')
+            self.assertLess(time.monotonic() - start, 1)
+        finally:
+            connection.execute('ROLLBACK')
+        self.assertEqual(self.accessed('key'), 0)
+
+    def test_eviction_by_size(self):
+        cache = self.make_cache(MAX_SIZE=10_000)
+        for i in range(20):
+            cache.set(f'key{i}', 'x' * 1000)
+        entries, size = cache._stats(cache._connection())
+        self.assertLessEqual(size, 10_000)
+        self.assertIsNotNone(cache.get('key19'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def read_during_request(self, request, write=False):
+        reads = []
+
+        def view(request):
+            reads.append(self.router.db_for_read(Post))
+            if write:
+                self.router.db_for_write(Post)
+                reads.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return reads, response
+
+    def test_reads_outside_requests_use_default(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_request_reads_from_replica(self):
+        reads, response = self.read_during_request(self.factory.get('/'))
+        self.assertEqual(reads, ['replica'])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_unsafe_methods_read_from_default(self):
+        reads, _ = self.read_during_request(self.factory.post('/'))
+        self.assertEqual(reads, ['default'])
+
+    def test_write_pins_user_to_default(self):
+        reads, response = self.read_during_request(
+            self.factory.get('/'), write=True
+        )
+        self.assertEqual(reads, ['replica', 'default'])
+        self.assertIn(PIN_COOKIE, response.cookies)
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = '1'
+        reads, _ = self.read_during_request(request)
+        self.assertEqual(reads, ['default'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaPinningTests(TestCase):
+    def test_redirect_after_follow_sets_pin_cookie(self):
+        reader = User.objects.create_user(username='replica_reader')
+        author = User.objects.create_user(username='replica_author')
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse('posts:profile_follow', args=[author.username])
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaCacheTests(TestCase):
+    """Реплику, которая ещё не получила запись, изображает default:
+    поколение меняется раньше, чем строка попадает в базу."""
+
+    def setUp(self):
+        cache.clear()
+        self.reader = User.objects.create_user(username='stale_reader')
+        self.author = User.objects.create_user(username='stale_author')
+        patcher = mock.patch.object(
+            ReplicaRouter, 'db_for_read', return_value='default'
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def catch_up(self):
+        Follow.objects.bulk_create(
+            [Follow(user=self.reader, author=self.author)]
+        )
+
+    def test_stale_follow_graph_is_not_cached(self):
+        follow_graph.changed(self.reader.pk)
+        with mock.patch(
+            'core.routers.reads_from_replicas', return_value=True
+        ):
+            self.assertEqual(
+                follow_graph.following_ids(self.reader.pk), frozenset()
+            )
+            self.catch_up()
+            self.assertEqual(
+                follow_graph.following_ids(self.reader.pk),
+                {self.author.pk}
+            )
+
+    @override_settings(REPLICA_PIN_SECONDS=0)
+    def test_settled_generation_is_cached(self):
+        with mock.patch(
+            'core.routers.reads_from_replicas', return_value=True
+        ):
+            self.assertEqual(
+                follow_graph.following_ids(self.reader.pk), frozenset()
+            )
+            self.catch_up()
+            self.assertEqual(
+                follow_graph.following_ids(self.reader.pk), frozenset()
+            )
+
+    def test_stale_feed_fragment_is_not_cached(self):
+        Post.objects.create(author=self.author, text='Старый пост')
+        caching.bump((caching.GLOBAL, None))
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, 'Новый пост')
+        Post.objects.bulk_create(
+            [Post(author=self.author, text='Новый пост')]
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def test_warm_templates_fills_cached_loader(self):
+        config = settings.TEMPLATES[0]
+        templates = [{
+            **config,
+            'APP_DIRS': False,
+            'OPTIONS': {
+                **config['OPTIONS'],
+                'loaders': [(
+                    'django.template.loaders.cached.Loader',
+                    settings.TEMPLATE_LOADERS
+                )],
+            },
+        }]
+        names = set(template_names(settings.TEMPLATES_DIR))
+        with override_settings(TEMPLATES=templates):
+            self.assertEqual(warm_templates(), len(names))
+            loader = engines.all()[0].engine.template_loaders[0]
+            self.assertIn('posts/includes/post_list.html', names)
+            self.assertTrue(names <= set(loader.get_template_cache))
+
+
+class StaticPipelineTests(SimpleTestCase):
+    def setUp(self):
+        self.source = tempfile.mkdtemp()
+        self.root = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.source, 'css'))
+        with open(os.path.join(self.source, 'css', 'site.css'), 'w') as css:
+            css.write('body { margin: 0; padding: 0; }\n' * 100)
+        settings_override = override_settings(
+            STATICFILES_DIRS=[self.source],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder'
+            ],
+            STATIC_ROOT=self.root,
+            STATICFILES_STORAGE=(
+                'core.storage.CompressedManifestStaticFilesStorage'
+            ),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.hashed = staticfiles_storage.stored_name('css/site.css')
+
+    def tearDown(self):
+        shutil.rmtree(self.source, ignore_errors=True)
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def test_collectstatic_builds_compressed_variants(self):
+        self.assertNotEqual(self.hashed, 'css/site.css')
+        expected = ['.gz'] + (['.br'] if storage.brotli else [])
+        for name in ('css/site.css', self.hashed):
+            for suffix in expected:
+                with self.subTest(file=name + suffix):
+                    self.assertTrue(
+                        os.path.exists(os.path.join(self.root, name + suffix))
+                    )
+
+    def test_hashed_file_served_compressed_and_immutable(self):
+        response = self.client.get(
+            f'/static/{self.hashed}', HTTP_ACCEPT_ENCODING='gzip, br'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            response['Content-Encoding'], 'br' if storage.brotli else 'gzip'
+        )
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertIn('immutable', response['Cache-Control'])
+        response.close()
+
+    def test_identity_and_revalidation(self):
+        response = self.client.get(
+            '/static/css/site.css', HTTP_ACCEPT_ENCODING='gzip;q=0'
+        )
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertTrue(
+            b''.join(response.streaming_content).startswith(b'body')
+        )
+        response = self.client.get(
+            '/static/css/site.css', HTTP_IF_NONE_MATCH=response['ETag']
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_accepted_encodings(self):
+        self.assertEqual(
+            accepted_encodings('gzip, deflate, br;q=0, *;q=0.1'),
+            {'gzip', 'deflate', '*'}
+        )
+
+
+class MediaViewTests(SimpleTestCase):
+    content = bytes(range(256)) * 4
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        for name in ('posts/photo.jpg', 'cache/ab/cd/thumb.jpg'):
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path))
+            with open(path, 'wb') as file:
+                file.write(self.content)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def get(self, path, **headers):
+        response = self.client.get(f'/media/{path}', **headers)
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_full_file(self):
+        response = self.get('posts/photo.jpg')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(response['Content-Type'], 'image/jpeg')
+        self.assertEqual(response['Content-Length'], str(len(self.content)))
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.body(response), self.content)
+
+    def test_thumbnails_are_immutable(self):
+        response = self.get('cache/ab/cd/thumb.jpg')
+        self.assertIn('immutable', response['Cache-Control'])
+
+    def test_ranges(self):
+        cases = {
+            'bytes=2-5': (2, 5),
+            'bytes=1020-': (1020, 1023),
+            'bytes=-3': (1021, 1023),
+            'bytes=1000-5000': (1000, 1023),
+        }
+        for header, (start, end) in cases.items():
+            with self.subTest(range=header):
+                response = self.get('posts/photo.jpg', HTTP_RANGE=header)
+                self.assertEqual(
+                    response.status_code, HTTPStatus.PARTIAL_CONTENT
+                )
+                self.assertEqual(
+                    response['Content-Range'], f'bytes {start}-{end}/1024'
+                )
+                self.assertEqual(
+                    self.body(response), self.content[start:end + 1]
+                )
+
+    def test_unsatisfiable_range(self):
+        response = self.get('posts/photo.jpg', HTTP_RANGE='bytes=2000-')
+        self.assertEqual(
+            response.status_code, HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE
+        )
+        self.assertEqual(response['Content-Range'], 'bytes */1024')
+
+    def test_stale_if_range_returns_whole_file(self):
+        response = self.get(
+            'posts/photo.jpg', HTTP_RANGE='bytes=0-1', HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_if_none_match(self):
+        etag = self.get('posts/photo.jpg')['ETag']
+        response = self.get('posts/photo.jpg', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    @override_settings(MEDIA_SENDFILE='x-accel-redirect')
+    def test_x_accel_redirect(self):
+        response = self.get('posts/photo.jpg', HTTP_RANGE='bytes=0-1')
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protected-media/posts/photo.jpg'
+        )
+        self.assertEqual(response.content, b'')
+
+    @override_settings(MEDIA_SENDFILE='x-sendfile')
+    def test_x_sendfile(self):
+        response = self.get('posts/photo.jpg')
+        self.assertEqual(
+            response['X-Sendfile'],
+            os.path.join(self.root, 'posts', 'photo.jpg')
+        )
+
+    def test_outside_media_root(self):
+        response = self.get('../settings.py')
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
@@ -1,4 +1,20 @@
+import mimetypes
+import os
+import posixpath
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import PermissionDenied, SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponse
 from django.shortcuts import render
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.crypto import constant_time_compare
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+from sorl.thumbnail.conf import settings as sorl_settings
+
+from . import metrics
+from .middleware import IMMUTABLE
 
 
 def page_not_found(request, exception):
@@ -15,3 +31,149 @@ def permission_denied(request, exception):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_view(request):
+    """Гистограммы запросов в текстовом формате Prometheus.
+
+    Доступ только с METRICS_TOKEN в заголовке Authorization.
+    """
+    token = settings.METRICS_TOKEN
+    if not token or not constant_time_compare(
+        request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}'
+    ):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.render(), content_type='text/plain; version=0.0.4'
+    )
+
+
+class _Unsatisfiable(ValueError):
+    pass
+
+
+class _RangeFile:
+    """Файл, из которого читается не больше length байт
+    с текущей позиции."""
+
+    def __init__(self, file, length):
+        self.file = file
+        self.remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self.remaining:
+            size = self.remaining
+        data = self.file.read(size)
+        self.remaining -= len(data)
+        return data
+
+    def close(self):
+        self.file.close()
+
+
+def _byte_range(header, size):
+    """(start, end) единственного диапазона байт из Range или None,
+    если заголовок не разобран и файл отдаётся целиком."""
+    unit, _, ranges = header.partition('=')
+    if unit.strip() != 'bytes' or ',' in ranges:
+        return None
+    start, _, end = ranges.strip().partition('-')
+    try:
+        if not start:
+            length = int(end)
+            if length <= 0:
+                raise _Unsatisfiable
+            return max(size - length, 0), size - 1
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    except _Unsatisfiable:
+        raise
+    except ValueError:
+        return None
+    if start >= size:
+        raise _Unsatisfiable
+    return (start, end) if start <= end else None
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+    if not if_range:
+        return True
+    if if_range.startswith(('"', 'W/')):
+        return if_range == etag
+    return parse_http_date_safe(if_range) == last_modified
+
+
+def _media_body(request, path, content_type, size, etag, last_modified):
+    sendfile = settings.MEDIA_SENDFILE
+    if sendfile:
+        # Range и отдачу тела берёт на себя фронтовой сервер.
+        response = HttpResponse(content_type=content_type)
+        name = os.path.relpath(path, settings.MEDIA_ROOT)
+        if sendfile == 'x-accel-redirect':
+            response['X-Accel-Redirect'] = (
+                settings.MEDIA_ACCEL_PREFIX + quote(name.replace(os.sep, '/'))
+            )
+        else:
+            response['X-Sendfile'] = path
+        return response
+    byte_range = None
+    if 'HTTP_RANGE' in request.META and _if_range_matches(
+        request, etag, last_modified
+    ):
+        try:
+            byte_range = _byte_range(request.META['HTTP_RANGE'], size)
+        except _Unsatisfiable:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{size}'
+            return response
+    file = open(path, 'rb')
+    if byte_range is None:
+        response = FileResponse(file)
+    else:
+        start, end = byte_range
+        file.seek(start)
+        response = FileResponse(_RangeFile(file, end - start + 1), status=206)
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+        response['Content-Length'] = end - start + 1
+    response['Content-Type'] = content_type
+    return response
+
+
+def media_view(request, path):
+    """Загруженные файлы из MEDIA_ROOT.
+
+    Отвечает 304 по If-None-Match и If-Modified-Since и отдаёт часть
+    файла по Range. Если задан MEDIA_SENDFILE, тело отдаёт фронтовой
+    сервер по X-Sendfile или X-Accel-Redirect, иначе — FileResponse,
+    который WSGI-сервер передаёт через wsgi.file_wrapper (в gunicorn
+    это sendfile без копирования в Python). Превью sorl-thumbnail
+    под тем же именем не меняются и кэшируются как immutable.
+    """
+    name = posixpath.normpath(path).lstrip('/')
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    etag = quote_etag(f'{int(stat.st_mtime):x}-{stat.st_size:x}')
+    last_modified = int(stat.st_mtime)
+    response = get_conditional_response(
+        request, etag=etag, last_modified=last_modified
+    )
+    if response is None:
+        content_type, _ = mimetypes.guess_type(name)
+        response = _media_body(
+            request, full_path, content_type or 'application/octet-stream',
+            stat.st_size, etag, last_modified
+        )
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    response['Accept-Ranges'] = 'bytes'
+    response['Cache-Control'] = (
+        IMMUTABLE if name.startswith(sorl_settings.THUMBNAIL_PREFIX)
+        else f'public, max-age={settings.MEDIA_MAX_AGE}'
+    )
+    return response
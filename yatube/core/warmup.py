@@ -0,0 +1,42 @@
+"""Прогрев шаблонов при старте процесса.
+
+Вне DEBUG шаблоны загружает django.template.loaders.cached: каждый
+шаблон разбирается с диска один раз, а дальше берётся скомпилированным.
+warm_templates() делает это заранее для всех шаблонов проекта, включая
+includes, поэтому первые запросы нового воркера не платят за разбор.
+"""
+import logging
+import os
+
+from django.template import TemplateSyntaxError, engines
+from django.template.backends.django import DjangoTemplates
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = ('.html', '.txt')
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.endswith(EXTENSIONS):
+                path = os.path.relpath(os.path.join(root, name), directory)
+                yield path.replace(os.sep, '/')
+
+
+def warm_templates():
+    """Компилирует шаблоны из DIRS всех движков Django и возвращает
+    их число."""
+    count = 0
+    for engine in engines.all():
+        if not isinstance(engine, DjangoTemplates):
+            continue
+        for directory in engine.engine.dirs:
+            for name in template_names(directory):
+                try:
+                    engine.get_template(name)
+                except TemplateSyntaxError:
+                    logger.exception('Не удалось разобрать шаблон %s', name)
+                    continue
+                count += 1
+    return count
@@ -0,0 +1,23 @@
+"""Настройки gunicorn для yatube.
+
+    gunicorn -c gunicorn.conf.py yatube.wsgi
+
+По умолчанию воркеры sync: с локальной SQLite запрос упирается
+в процессор и GIL, и потоки gthread не быстрее, а p95 у них хуже
+(python -m benchmarks.concurrency, таблица в README). GUNICORN_THREADS
+больше 1 включает gthread — для установки, где запрос ждёт сеть:
+базу на другом сервере, удалённое хранилище картинок.
+"""
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(
+    os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1)
+)
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = 30
+keepalive = 5
+max_requests = 1000
+max_requests_jitter = 100
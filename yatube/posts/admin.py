@@ -1,6 +1,8 @@
 from django.contrib import admin
+from django.contrib.admin.views.main import SEARCH_VAR
 
 from .models import Comment, Follow, Group, Post
+from .search import rank_posts
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -16,6 +18,18 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term:
+            return queryset, False
+        return rank_posts(queryset, search_term), False
+
+    def get_ordering(self, request):
+        # Без явной сортировки по колонке результаты поиска идут
+        # по релевантности.
+        if request.GET.get(SEARCH_VAR):
+            return ('-search_rank',)
+        return super().get_ordering(request)
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = (
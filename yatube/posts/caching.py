@@ -0,0 +1,201 @@
+"""Поколения кэшируемых лент.
+
+Ключ фрагмента ленты включает её текущее поколение. Сигналы Post,
+Comment и Follow заменяют поколение затронутых лент, поэтому старые
+фрагменты перестают читаться сразу после записи, а сами фрагменты
+можно хранить часами.
+
+Внутри фрагмента страницы каждая карточка поста кэшируется отдельно
+(CardCache): промах по странице перерисовывает только карточки,
+которые изменились.
+
+Реплики отстают от default, поэтому запрос, читающий с реплик, не кладёт
+в кэш записи под только что сменившимся поколением (cache_timeout):
+иначе старые данные жили бы под новым ключом весь срок фрагмента.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core import routers
+
+GLOBAL = 'global'
+GROUP = 'group'
+AUTHOR = 'author'
+FOLLOWER = 'follower'
+FOLLOWING = 'following'
+RECOMMENDATIONS = 'recommendations'
+AUTHOR_CARD = 'author_card'
+GROUP_CARD = 'group_card'
+
+
+def _generation_key(scope, pk):
+    return f'feed-generation:{scope}:{pk}'
+
+
+def _new_generation():
+    # Время смены в начале значения нужно cache_timeout.
+    return f'{int(time.time() * 1000):x}-{uuid.uuid4().hex}'
+
+
+def _changed_at(value):
+    stamp, _, _ = value.partition('-')
+    try:
+        return int(stamp, 16) / 1000
+    except ValueError:
+        return 0
+
+
+def generation(scope, pk=None):
+    key = _generation_key(scope, pk)
+    value = cache.get(key)
+    if value is None:
+        cache.add(key, _new_generation(), None)
+        value = cache.get(key)
+    return value
+
+
+def generations(feeds):
+    """Поколения нескольких лент одним чтением кэша."""
+    keys = {feed: _generation_key(*feed) for feed in feeds}
+    values = cache.get_many(list(keys.values()))
+    return {
+        feed: values[key] if key in values else generation(*feed)
+        for feed, key in keys.items()
+    }
+
+
+def bump(*feeds):
+    """Меняет поколение лент, заданных парами (scope, pk)."""
+    cache.set_many(
+        {_generation_key(*feed): _new_generation() for feed in feeds},
+        None
+    )
+
+
+def cache_timeout(timeout, *versions):
+    """Срок хранения записи кэша, ключ которой включает поколения versions.
+
+    Если запрос читает с реплик, а поколение сменилось меньше
+    REPLICA_PIN_SECONDS назад, данные могли прийти с реплики, ещё
+    не получившей эту запись: тогда 0, и запись не сохраняется.
+    """
+    if routers.reads_from_replicas():
+        recent = time.time() - settings.REPLICA_PIN_SECONDS
+        if any(_changed_at(version) > recent for version in versions):
+            return 0
+    return timeout
+
+
+def _page_feeds(posts, author_scope, group_scope):
+    feeds = {(author_scope, post.author_id) for post in posts}
+    feeds.update(
+        (group_scope, post.group_id) for post in posts if post.group_id
+    )
+    return feeds
+
+
+def _ordered(feeds):
+    versions = generations(feeds)
+    return [versions[feed] for feed in sorted(feeds)]
+
+
+def card_versions(posts):
+    """Поколения авторов и групп карточек постов в постоянном порядке:
+    для ETag страниц, в которые эти карточки вложены."""
+    return _ordered(_page_feeds(posts, AUTHOR_CARD, GROUP_CARD))
+
+
+def feed_cache(request, scope, pk=None, vary='', posts=()):
+    """Ключ и срок жизни фрагмента страницы ленты для тега {% cache %}.
+
+    vary различает варианты одной страницы, например состояние
+    кнопок подписки у разных читателей. posts — посты страницы: ключ
+    включает поколения их карточек, потому что переименование автора
+    или группы меняет карточки, но не поколение ленты, в которую они
+    вложены. Лента подписок проверяется ещё и по поколениям AUTHOR
+    и GROUP постов: запись поста или комментария меняет поколения
+    только своего автора и группы, а не лент всех подписчиков.
+    Новый пост меняет сам список постов страницы.
+    """
+    feeds = _page_feeds(posts, AUTHOR_CARD, GROUP_CARD)
+    if scope == FOLLOWER:
+        feeds.update(_page_feeds(posts, AUTHOR, GROUP))
+    versions = [generation(scope, pk), *_ordered(feeds)]
+    parts = [str(post.pk) for post in posts] + versions
+    return {
+        'key': '.'.join((
+            scope,
+            str(pk),
+            versions[0],
+            request.GET.get('cursor', ''),
+            hashlib.md5('.'.join(parts).encode()).hexdigest() + vary,
+        )),
+        'timeout': cache_timeout(settings.FEED_CACHE_TIMEOUT, *versions),
+    }
+
+
+class CardCache:
+    """Фрагменты карточек постов одной страницы для тега post_card.
+
+    Ключ карточки меняется при правке поста, новом комментарии,
+    готовности превью и изменении автора или группы, но не при новых
+    постах в ленте, поэтому остальные карточки берутся из кэша.
+    Версии и готовые фрагменты читаются двумя get_many при первой
+    карточке, то есть только когда сама страница не нашлась в кэше.
+    Создаётся после thumbnails.prefetch.
+    """
+
+    def __init__(self, posts):
+        self.posts = list(posts)
+        self._keys = None
+        self._fragments = None
+
+    def _load(self):
+        versions = generations(
+            _page_feeds(self.posts, AUTHOR_CARD, GROUP_CARD)
+        )
+        self._timeout = cache_timeout(
+            settings.CARD_CACHE_TIMEOUT, *versions.values()
+        )
+        self._keys = {
+            post.pk: 'post-card:' + '.'.join((
+                str(post.pk),
+                post.updated.isoformat(),
+                str(post.comments_count),
+                'thumbnail' if getattr(post, 'thumbnail_url', None) else '',
+                versions[(AUTHOR_CARD, post.author_id)],
+                versions.get((GROUP_CARD, post.group_id), ''),
+            ))
+            for post in self.posts
+        }
+        self._fragments = cache.get_many(list(self._keys.values()))
+
+    def get(self, post):
+        if self._keys is None:
+            self._load()
+        key = self._keys.get(post.pk)
+        return key and self._fragments.get(key)
+
+    def set(self, post, html):
+        key = self._keys.get(post.pk)
+        if key and self._timeout:
+            cache.set(key, html, self._timeout)
+
+
+def post_feeds(post, group_ids=()):
+    """Ленты, в которых показывается пост.
+
+    Ленты подписчиков сюда не входят: их фрагменты проверяются
+    по поколениям своих постов (feed_cache с posts), а число
+    подписчиков не должно влиять на цену записи.
+    """
+    feeds = [(GLOBAL, None), (AUTHOR, post.author_id)]
+    feeds.extend(
+        (GROUP, group_id)
+        for group_id in {post.group_id, *group_ids} if group_id is not None
+    )
+    return feeds
@@ -0,0 +1,105 @@
+"""Инкрементальное обновление и пересчёт денормализованных счётчиков."""
+from django.db.models import Case, Count, F, OuterRef, Subquery, When
+from django.db.models.functions import Coalesce, Greatest
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _change(queryset, field, delta):
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gt': 0})
+    return queryset.update(**{field: F(field) + delta})
+
+
+def _count_subquery(model, field):
+    counts = model.objects.filter(
+        **{field: OuterRef('pk')}
+    ).order_by().values(field).annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(counts), 0)
+
+
+def change_author_posts(author_id, delta):
+    stats = UserStats.objects.filter(user_id=author_id)
+    if not _change(stats, 'posts_count', delta) and delta > 0:
+        UserStats.objects.update_or_create(
+            user_id=author_id,
+            defaults={
+                'posts_count': Post.objects.filter(
+                    author_id=author_id
+                ).count()
+            }
+        )
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _change(Group.objects.filter(pk=group_id), 'posts_count', delta)
+
+
+def change_post_comments(post_id, delta):
+    _change(Post.objects.filter(pk=post_id), 'comments_count', delta)
+
+
+def change_follow_counts(user_id, author_id, delta):
+    """Счётчики подписок подписчика и подписчиков автора одним UPDATE."""
+    def changed(field, pk):
+        return Case(
+            When(user_id=pk, then=Greatest(F(field) + delta, 0)),
+            default=F(field)
+        )
+
+    UserStats.objects.filter(user_id__in=(user_id, author_id)).update(
+        following_count=changed('following_count', user_id),
+        followers_count=changed('followers_count', author_id),
+    )
+
+
+def _user_count_subquery(field):
+    return Coalesce(Subquery(
+        Follow.objects.filter(
+            **{field: OuterRef('user_id')}
+        ).order_by().values(field).annotate(
+            total=Count('pk')
+        ).values('total')
+    ), 0)
+
+
+def _only(queryset, field, ids):
+    if ids is None:
+        return queryset
+    return queryset.filter(**{f'{field}__in': ids})
+
+
+def recount(user_ids=None, group_ids=None, post_ids=None):
+    """Пересчитывает счётчики пакетными UPDATE ... SELECT COUNT.
+
+    Без аргументов — все счётчики; иначе только у перечисленных
+    пользователей, групп и постов (пустой список — ни у кого).
+    """
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in _only(
+                User.objects.filter(stats__isnull=True), 'pk', user_ids
+            ).values_list('pk', flat=True).iterator()
+        ),
+        batch_size=500,
+        ignore_conflicts=True
+    )
+    _only(UserStats.objects, 'user_id', user_ids).update(
+        posts_count=Coalesce(Subquery(
+            Post.objects.filter(
+                author_id=OuterRef('user_id')
+            ).order_by().values('author_id').annotate(
+                total=Count('pk')
+            ).values('total')
+        ), 0),
+        followers_count=_user_count_subquery('author_id'),
+        following_count=_user_count_subquery('user_id'),
+    )
+    _only(Group.objects, 'pk', group_ids).update(
+        posts_count=_count_subquery(Post, 'group')
+    )
+    _only(Post.objects, 'pk', post_ids).update(
+        comments_count=_count_subquery(Comment, 'post')
+    )
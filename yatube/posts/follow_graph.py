@@ -0,0 +1,49 @@
+"""Кэш графа подписок: на каких авторов подписан пользователь.
+
+Множество id авторов лежит в кэше под ключом с поколением
+caching.FOLLOWING, поэтому проверки «подписан ли» — и по одному
+автору, и пачкой для всей страницы ленты — обходятся без базы.
+Подписка и отписка меняют поколение сразу и ещё раз после коммита:
+множество, прочитанное из базы до коммита, под новый ключ не попадёт.
+"""
+from django.core.cache import cache
+from django.db import transaction
+
+from . import caching
+from .models import Follow
+
+TIMEOUT = 60 * 60 * 24
+
+
+def following_ids(user_id):
+    """frozenset id авторов, на которых подписан пользователь."""
+    generation = caching.generation(caching.FOLLOWING, user_id)
+    key = f'following:{user_id}:{generation}'
+    ids = cache.get(key)
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(user_id=user_id).values_list(
+                'author_id', flat=True
+            )
+        )
+        timeout = caching.cache_timeout(TIMEOUT, generation)
+        if timeout:
+            cache.set(key, ids, timeout)
+    return ids
+
+
+def is_following(user, author_id):
+    return user.is_authenticated and author_id in following_ids(user.pk)
+
+
+def following_among(user, author_ids):
+    """Те из author_ids, на кого подписан пользователь."""
+    if not user.is_authenticated:
+        return frozenset()
+    return following_ids(user.pk).intersection(author_ids)
+
+
+def changed(*user_ids):
+    feeds = [(caching.FOLLOWING, user_id) for user_id in user_ids]
+    caching.bump(*feeds)
+    transaction.on_commit(lambda: caching.bump(*feeds))
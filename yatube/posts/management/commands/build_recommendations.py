@@ -0,0 +1,57 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает рекомендации «кого почитать» по подпискам '
+        'и комментариям. Нужны numpy и scipy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--top-k',
+            type=int,
+            default=recommendations.TOP_K,
+            help='Сколько авторов сохранять для пользователя.'
+        )
+        parser.add_argument(
+            '--neighbours',
+            type=int,
+            default=recommendations.NEIGHBOURS,
+            help='Сколько похожих авторов оставлять у каждого автора.'
+        )
+        parser.add_argument(
+            '--comment-weight',
+            type=float,
+            default=0,
+            help='Вес комментария к посту автора; 0 — только подписки.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            import numpy  # noqa: F401
+            import scipy  # noqa: F401
+        except ImportError:
+            raise CommandError('Установите numpy и scipy.')
+        weight = options['comment_weight']
+        start = time.perf_counter()
+        follows, comments = recommendations.load_edges(comments=weight > 0)
+        loaded = time.perf_counter()
+        result = recommendations.compute(
+            follows, comments, weight,
+            top_k=options['top_k'], neighbours=options['neighbours']
+        )
+        computed = time.perf_counter()
+        total = recommendations.store(*result)
+        stored = time.perf_counter()
+        edges = len(follows) + (0 if comments is None else len(comments))
+        self.stdout.write(
+            f'Рёбер: {edges}; загрузка {loaded - start:.1f} с, '
+            f'расчёт {computed - loaded:.1f} с, '
+            f'запись {stored - computed:.1f} с'
+        )
+        self.stdout.write(self.style.SUCCESS(f'Рекомендаций: {total}'))
@@ -0,0 +1,33 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково выгружает группы, посты, комментарии и подписки '
+        'в JSONL-файл или в каталог CSV-файлов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл JSONL («-» — stdout) или каталог для CSV.'
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default='jsonl'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        rows = transfer.export_rows()
+        if options['format'] == 'csv':
+            count = transfer.write_csv(rows, path)
+        elif path == '-':
+            count = transfer.write_jsonl(rows, sys.stdout)
+        else:
+            with open(path, 'w', encoding='utf-8') as stream:
+                count = transfer.write_jsonl(rows, stream)
+        self.stderr.write(self.style.SUCCESS(f'Выгружено записей: {count}'))
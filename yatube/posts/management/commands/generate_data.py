@@ -0,0 +1,131 @@
+import datetime as dt
+import itertools
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+
+from posts import transfer
+from posts.models import Comment, Post
+
+# Объёмы при --scale 1.
+BASE = {
+    'users': 100_000,
+    'groups': 1_000,
+    'posts': 1_000_000,
+    'comments': 2_000_000,
+}
+FOLLOWS_PER_USER = 50
+START = dt.datetime(2020, 1, 1)
+PERIOD = dt.timedelta(days=3 * 365)
+WORDS = (
+    'пост лента группа автор подписка комментарий картинка текст '
+    'новости сегодня вечер утро город погода путешествие код '
+    'кот собака море горы книга фильм музыка спорт работа отпуск'
+).split()
+
+
+def _text(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def _date(index, total):
+    return (START + PERIOD * (index / max(total, 1))).isoformat()
+
+
+def generate_rows(counts, follows_per_user, seed):
+    """Детерминированные записи в формате transfer при одном seed.
+
+    Посты распределены по авторам равномерно, а подписки — по Ципфу:
+    немногие популярные авторы собирают большую часть подписчиков.
+    """
+    rng = random.Random(seed)
+    users = [f'user_{i}' for i in range(counts['users'])]
+    popularity = list(itertools.accumulate(
+        1 / (rank + 1) for rank in range(len(users))
+    ))
+
+    def popular_user():
+        return rng.choices(users, cum_weights=popularity)[0]
+
+    slugs = [f'group-{i}' for i in range(counts['groups'])]
+    for slug in slugs:
+        yield 'group', {
+            'slug': slug,
+            'title': f'Группа {slug}',
+            'description': _text(rng, 20),
+        }
+    first_post = (Post.objects.aggregate(pk=Max('pk'))['pk'] or 0) + 1
+    for index in range(counts['posts']):
+        date = _date(index, counts['posts'])
+        yield 'post', {
+            'id': first_post + index,
+            'text': _text(rng, rng.randint(5, 60)),
+            'pub_date': date,
+            'updated': date,
+            'author': rng.choice(users),
+            'group': rng.choice(slugs) if slugs and rng.random() < 0.7
+            else '',
+            'image': '',
+        }
+    first_comment = (Comment.objects.aggregate(pk=Max('pk'))['pk'] or 0) + 1
+    for index in range(counts['comments'] if counts['posts'] else 0):
+        yield 'comment', {
+            'id': first_comment + index,
+            'post': first_post + rng.randrange(counts['posts']),
+            'author': rng.choice(users),
+            'text': _text(rng, rng.randint(3, 20)),
+            'created': _date(index, counts['comments']),
+        }
+    for user in users:
+        authors = {
+            popular_user()
+            for _ in range(rng.randint(0, 2 * follows_per_user))
+        }
+        authors.discard(user)
+        for author in sorted(authors):
+            yield 'follow', {'user': user, 'author': author}
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт детерминированный синтетический набор данных: '
+        'пользователей, группы, посты, комментарии и подписки.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale',
+            type=float,
+            default=0.01,
+            help=(
+                'Доля от 100k пользователей, 1k групп, 1M постов '
+                'и 2M комментариев (по умолчанию 0.01).'
+            )
+        )
+        for name in BASE:
+            parser.add_argument(
+                f'--{name}', type=int, help='Точное число вместо --scale.'
+            )
+        parser.add_argument(
+            '--follows-per-user', type=int, default=FOLLOWS_PER_USER
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        counts = {
+            name: options[name] if options[name] is not None
+            else max(1, round(base * options['scale']))
+            for name, base in BASE.items()
+        }
+        rows = generate_rows(
+            counts, options['follows_per_user'], options['seed']
+        )
+        loader = transfer.Loader()
+        with transaction.atomic():
+            created = loader.load(rows)
+            transfer.rebuild_derived(loader)
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{model}: {count}' for model, count in created.items())
+        ))
@@ -0,0 +1,62 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def _init_worker():
+    django.setup()
+    connections.close_all()
+
+
+def _generate(name):
+    try:
+        thumbnails.generate(name)
+    except Exception as error:
+        return name, str(error)
+    return name, None
+
+
+class Command(BaseCommand):
+    help = 'Параллельно создаёт превью для всех картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count(),
+            help=(
+                'Число процессов (по умолчанию — число ядер); '
+                '1 — без пула, в текущем процессе.'
+            )
+        )
+
+    def generate(self, names, workers):
+        if workers <= 1:
+            yield from map(_generate, names)
+            return
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker
+        ) as executor:
+            yield from executor.map(_generate, names, chunksize=8)
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image='').values_list(
+                'image', flat=True
+            ).distinct()
+        )
+        failed = 0
+        for name, error in self.generate(names, options['workers']):
+            if error:
+                failed += 1
+                self.stderr.write(f'{name}: {error}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Превью готовы: {len(names) - failed} из {len(names)}'
+        ))
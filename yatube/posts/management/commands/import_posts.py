@@ -0,0 +1,42 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Потоково загружает группы, посты, комментарии и подписки '
+        'из JSONL-файла или каталога CSV-файлов пачками bulk_create, '
+        'затем пересобирает счётчики, ленты и поисковый индекс.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path',
+            help='Файл JSONL («-» — stdin) или каталог с CSV.'
+        )
+        parser.add_argument(
+            '--format', choices=('jsonl', 'csv'), default='jsonl'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        loader = transfer.Loader()
+        try:
+            with transaction.atomic():
+                if options['format'] == 'csv':
+                    counts = loader.load(transfer.read_csv(path))
+                elif path == '-':
+                    counts = loader.load(transfer.read_jsonl(sys.stdin))
+                else:
+                    with open(path, encoding='utf-8') as stream:
+                        counts = loader.load(transfer.read_jsonl(stream))
+                transfer.rebuild_derived(loader)
+        except transfer.ConflictError as error:
+            raise CommandError(f'{error}; ничего не импортировано.')
+        self.stdout.write(self.style.SUCCESS(
+            ', '.join(f'{model}: {count}' for model, count in counts.items())
+        ))
@@ -0,0 +1,47 @@
+# Generated by Django 2.2.28 on 2026-10-18 00:50
+
+from django.db import migrations, models
+import django.db.models.deletion
+import math
+import re
+from collections import Counter
+
+
+def fill_search_index(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    for post in Post.objects.all():
+        counts = Counter(
+            token[:64]
+            for token in re.findall(r'\w+', post.text.lower().replace('ё', 'е'))
+            if len(token) > 1
+        )
+        norm = math.sqrt(sum(counts.values())) or 1
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post.pk, weight=count / norm)
+            for term, count in counts.items()
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_counters'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('weight', models.FloatField()),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term'),
+        ),
+        migrations.RunPython(fill_search_index, migrations.RunPython.noop),
+    ]
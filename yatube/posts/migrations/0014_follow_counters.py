@@ -0,0 +1,40 @@
+# Generated by Django 2.2.28 on 2026-10-18 01:13
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_follow_counts(apps, schema_editor):
+    UserStats = apps.get_model('posts', 'UserStats')
+    Follow = apps.get_model('posts', 'Follow')
+    for field, counter in (
+        ('author_id', 'followers_count'), ('user_id', 'following_count')
+    ):
+        totals = Follow.objects.order_by().values(field).annotate(
+            total=Count('pk')
+        )
+        for row in totals.iterator():
+            UserStats.objects.filter(user_id=row[field]).update(
+                **{counter: row['total']}
+            )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_updated'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='followers_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число подписчиков'),
+        ),
+        migrations.AddField(
+            model_name='userstats',
+            name='following_count',
+            field=models.PositiveIntegerField(default=0, verbose_name='Число подписок'),
+        ),
+        migrations.RunPython(fill_follow_counts, migrations.RunPython.noop),
+    ]
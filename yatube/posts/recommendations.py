@@ -0,0 +1,195 @@
+"""Рекомендации «кого почитать» по графу подписок.
+
+Считаются офлайн командой build_recommendations, потому что соединять
+Follow с самим собой на каждом запросе слишком дорого. Подписки
+(и, если задан вес, комментарии к чужим постам) складываются
+в разреженную матрицу пользователь × автор. Сходство двух авторов —
+косинус их столбцов, у каждого автора остаются NEIGHBOURS самых
+похожих. Оценка автора для пользователя — сумма сходств с теми, кого
+он уже читает. TOP_K лучших авторов, на которых пользователь ещё
+не подписан, сохраняются в Recommendation, и страница берёт их одним
+запросом по индексу (user, rank).
+
+Для расчёта нужны numpy и scipy; для чтения рекомендаций — нет.
+"""
+import itertools
+
+from django.db import transaction
+from django.db.models import F
+
+from . import caching, follow_graph
+from .models import Comment, Follow, Recommendation
+
+TOP_K = 10
+NEIGHBOURS = 50
+SHOWN = 5
+CHUNK_SIZE = 2000
+BATCH_SIZE = 1000
+
+
+def _edges(queryset):
+    import numpy as np
+
+    pairs = np.fromiter(
+        itertools.chain.from_iterable(queryset.iterator()), dtype=np.int64
+    )
+    return pairs.reshape(-1, 2)
+
+
+def load_edges(comments=False):
+    """Рёбра графа: пары (пользователь, автор) подписок и, если нужно,
+    комментариев к чужим постам."""
+    follows = _edges(Follow.objects.values_list('user_id', 'author_id'))
+    if not comments:
+        return follows, None
+    commented = Comment.objects.exclude(
+        post__author_id=F('author_id')
+    ).values_list('author_id', 'post__author_id')
+    return follows, _edges(commented)
+
+
+def _top_per_row(matrix, k):
+    """(строка, столбец, значение, место) k наибольших значений каждой
+    строки разреженной матрицы, по убыванию."""
+    import numpy as np
+
+    rows, columns, values, ranks = [], [], [], []
+    for row in range(matrix.shape[0]):
+        start, stop = matrix.indptr[row], matrix.indptr[row + 1]
+        if start == stop:
+            continue
+        data = matrix.data[start:stop]
+        indices = matrix.indices[start:stop]
+        if stop - start > k:
+            best = np.argpartition(-data, k - 1)[:k]
+        else:
+            best = np.arange(stop - start)
+        best = best[np.lexsort((indices[best], -data[best]))]
+        rows.append(np.full(len(best), row))
+        columns.append(indices[best])
+        values.append(data[best])
+        ranks.append(np.arange(len(best)))
+    if not rows:
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([]), empty
+    return (
+        np.concatenate(rows), np.concatenate(columns),
+        np.concatenate(values), np.concatenate(ranks),
+    )
+
+
+def compute(follows, comments=None, comment_weight=0.5, top_k=TOP_K,
+            neighbours=NEIGHBOURS):
+    """Лучшие авторы для каждого пользователя.
+
+    follows и comments — массивы пар (user_id, author_id). Возвращает
+    массивы user_id, author_id, оценок и мест в списке пользователя.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    if not len(follows):
+        empty = np.array([], dtype=np.int64)
+        return empty, empty, np.array([]), empty
+    edges, weights = follows, np.ones(len(follows), dtype=np.float32)
+    if comments is not None and len(comments):
+        edges = np.concatenate((follows, comments))
+        weights = np.concatenate((
+            weights, np.full(len(comments), comment_weight, np.float32)
+        ))
+    user_ids, user_index = np.unique(edges[:, 0], return_inverse=True)
+    author_ids, author_index = np.unique(edges[:, 1], return_inverse=True)
+    shape = (len(user_ids), len(author_ids))
+    matrix = sparse.csr_matrix(
+        (weights, (user_index, author_index)), shape=shape
+    )
+    # Сотня комментариев одному автору не должна перевешивать
+    # остальные подписки пользователя.
+    matrix.data = np.log1p(matrix.data)
+
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=0))[0])
+    normalized = (matrix @ sparse.diags(1 / norms)).tocsc()
+    transposed = normalized.T.tocsr()
+    blocks = []
+    for start in range(0, shape[1], CHUNK_SIZE):
+        block = (transposed[start:start + CHUNK_SIZE] @ normalized).tocsr()
+        block.setdiag(0, k=start)
+        block.eliminate_zeros()
+        rows, columns, values, _ = _top_per_row(block, neighbours)
+        blocks.append(sparse.csr_matrix(
+            (values, (rows, columns)), shape=block.shape
+        ))
+    similarity = sparse.vstack(blocks).tocsr()
+
+    # Уже прочитанных авторов и самого пользователя не советуем.
+    follow_mask = sparse.csr_matrix(
+        (
+            np.ones(len(follows), dtype=np.float32),
+            (user_index[:len(follows)], author_index[:len(follows)])
+        ),
+        shape=shape
+    )
+    own_users = np.flatnonzero(np.isin(user_ids, author_ids))
+    own_mask = sparse.csr_matrix(
+        (
+            np.ones(len(own_users), dtype=np.float32),
+            (own_users, np.searchsorted(author_ids, user_ids[own_users]))
+        ),
+        shape=shape
+    )
+    excluded = ((follow_mask + own_mask) > 0).astype(np.float32)
+
+    result = [], [], [], []
+    for start in range(0, shape[0], CHUNK_SIZE):
+        stop = start + CHUNK_SIZE
+        scores = (matrix[start:stop] @ similarity).tocsr()
+        scores = (scores - scores.multiply(excluded[start:stop])).tocsr()
+        scores.eliminate_zeros()
+        rows, columns, values, ranks = _top_per_row(scores, top_k)
+        for column, part in zip(result, (
+            user_ids[start + rows], author_ids[columns], values, ranks
+        )):
+            column.append(part)
+    return tuple(
+        np.concatenate(column) if column else np.array([])
+        for column in result
+    )
+
+
+def store(users, authors, scores, ranks):
+    """Заменяет все рекомендации новым расчётом."""
+    rows = zip(
+        users.tolist(), authors.tolist(), scores.tolist(), ranks.tolist()
+    )
+    with transaction.atomic():
+        Recommendation.objects.all().delete()
+        while True:
+            batch = [
+                Recommendation(
+                    user_id=user_id, author_id=author_id,
+                    score=score, rank=rank
+                )
+                for user_id, author_id, score, rank in itertools.islice(
+                    rows, BATCH_SIZE
+                )
+            ]
+            if not batch:
+                break
+            Recommendation.objects.bulk_create(batch)
+    caching.bump((caching.RECOMMENDATIONS, None))
+    return len(users)
+
+
+def for_user(user, exclude=(), limit=SHOWN):
+    """Рекомендованные пользователю авторы, на которых он ещё
+    не подписан."""
+    if not user.is_authenticated:
+        return []
+    skipped = follow_graph.following_ids(user.pk).union(exclude)
+    recommendations = Recommendation.objects.filter(
+        user_id=user.pk
+    ).select_related('author')[:TOP_K]
+    return [
+        recommendation.author for recommendation in recommendations
+        if recommendation.author_id not in skipped
+    ][:limit]
@@ -0,0 +1,152 @@
+"""Полнотекстовый поиск по постам на собственном инвертированном индексе.
+
+Каждый пост раскладывается на слова (SearchTerm), запрос читает только
+списки постов для слов из запроса, поэтому время поиска зависит от
+частоты слов, а не от общего числа постов. От каждого слова читается
+не больше MAX_POSTINGS самых новых постов, чтобы частые слова вроде
+«и» не разгоняли GROUP BY до размера всей таблицы.
+"""
+import functools
+import math
+import operator
+import re
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import (Case, Count, F, FloatField, Max, OuterRef, Q,
+                              Subquery, Sum, Value, When)
+
+from .models import Post, SearchTerm
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_QUERY_TERMS = 10
+MAX_RESULTS = 500
+MAX_POSTINGS = 5000
+BATCH_SIZE = 500
+
+
+def tokenize(text):
+    max_length = SearchTerm._meta.get_field('term').max_length
+    return [
+        token[:max_length]
+        for token in TOKEN_RE.findall(text.lower().replace('ё', 'е'))
+        if len(token) > 1
+    ]
+
+
+def build_terms(post):
+    counts = Counter(tokenize(post.text))
+    norm = math.sqrt(sum(counts.values())) or 1
+    return [
+        SearchTerm(term=term, post_id=post.pk, weight=count / norm)
+        for term, count in counts.items()
+    ]
+
+
+def index_post(post):
+    SearchTerm.objects.filter(post_id=post.pk).delete()
+    SearchTerm.objects.bulk_create(build_terms(post), batch_size=BATCH_SIZE)
+
+
+@transaction.atomic
+def rebuild(post_ids=None):
+    """Пересобирает индекс всех постов или только перечисленных."""
+    posts = Post.objects.only('pk', 'text')
+    terms = SearchTerm.objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+        terms = terms.filter(post_id__in=post_ids)
+    terms.delete()
+    batch = []
+    for post in posts.iterator():
+        batch.extend(build_terms(post))
+        if len(batch) >= BATCH_SIZE:
+            SearchTerm.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+            batch = []
+    SearchTerm.objects.bulk_create(batch, batch_size=BATCH_SIZE)
+
+
+def _postings(terms):
+    """Условие на MAX_POSTINGS самых новых вхождений каждого слова.
+
+    Подзапросы идут по индексу (term, post) с конца и обрываются
+    на LIMIT, сколько бы постов ни содержало слово.
+    """
+    return functools.reduce(operator.or_, (
+        Q(pk__in=SearchTerm.objects.filter(term=term).order_by(
+            '-post_id'
+        ).values('pk')[:MAX_POSTINGS])
+        for term in terms
+    ))
+
+
+def _idf(query):
+    """idf слов запроса, которые есть в индексе."""
+    terms = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TERMS]
+    if not terms:
+        return {}
+    # Частота слова тоже считается не дальше MAX_POSTINGS: у частых слов
+    # idf и так близок к нулю.
+    frequencies = dict(
+        SearchTerm.objects.filter(_postings(terms)).values(
+            'term'
+        ).annotate(total=Count('pk')).values_list('term', 'total')
+    )
+    if not frequencies:
+        return {}
+    # Максимальный id вместо COUNT(*): оценка числа постов по индексу.
+    posts_total = Post.objects.aggregate(total=Max('pk'))['total'] or 1
+    return {
+        term: math.log(1 + posts_total / total)
+        for term, total in frequencies.items()
+    }
+
+
+def _rank(idf):
+    return Sum(
+        F('weight') * Case(
+            *(When(term=term, then=Value(value))
+              for term, value in idf.items()),
+            output_field=FloatField()
+        ),
+        output_field=FloatField()
+    )
+
+
+def ranked_post_ids(query, limit=MAX_RESULTS):
+    """Id постов по убыванию TF-IDF релевантности запросу.
+
+    Ранжирование идёт целиком по SearchTerm, без соединения с Post;
+    при равной релевантности выше более новый пост.
+    """
+    idf = _idf(query)
+    if not idf:
+        return []
+    return list(
+        SearchTerm.objects.filter(_postings(idf)).values(
+            'post_id'
+        ).annotate(rank=_rank(idf)).order_by(
+            '-rank', '-post_id'
+        ).values_list('post_id', flat=True)[:limit]
+    )
+
+
+def rank_posts(queryset, query):
+    """Оставляет в queryset найденные посты с релевантностью search_rank.
+
+    Для админки: там нужны все найденные посты, а не первые
+    MAX_RESULTS и не только MAX_POSTINGS самых новых вхождений слова,
+    и сортировку делает сам changelist. Релевантность каждого поста
+    считается по его собственным словам через индекс по post.
+    """
+    idf = _idf(query)
+    if not idf:
+        return queryset.none().annotate(
+            search_rank=Value(0, output_field=FloatField())
+        )
+    ranks = SearchTerm.objects.filter(
+        post_id=OuterRef('pk'), term__in=idf
+    ).values('post_id').annotate(rank=_rank(idf)).values('rank')
+    return queryset.filter(
+        pk__in=SearchTerm.objects.filter(term__in=idf).values('post_id')
+    ).annotate(search_rank=Subquery(ranks, output_field=FloatField()))
@@ -1,9 +1,65 @@
-from .models import Post
+from .models import Comment, Group, Post, User
 
 from rest_framework import serializers
 
 
-class PostSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """Оставляет в ответе только поля из ?fields=a,b."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        fields = request and request.query_params.get('fields')
+        if fields:
+            allowed = set(fields.split(','))
+            for name in set(self.fields) - allowed:
+                self.fields.pop(name)
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True
+    )
+    group = serializers.SlugRelatedField(slug_field='slug', read_only=True)
+
     class Meta:
         model = Post
-        fields = ('text', 'pub_date', 'author', 'group', 'image')
+        fields = (
+            'id', 'text', 'pub_date', 'author', 'group', 'image',
+            'comments_count',
+        )
+
+
+class GroupSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    class Meta:
+        model = Group
+        fields = ('id', 'title', 'slug', 'description', 'posts_count')
+
+
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    author = serializers.SlugRelatedField(
+        slug_field='username', read_only=True
+    )
+
+    class Meta:
+        model = Comment
+        fields = ('id', 'post', 'author', 'text', 'created')
+
+
+class ProfileSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    posts_count = serializers.IntegerField(
+        source='stats.posts_count', read_only=True
+    )
+    followers_count = serializers.IntegerField(
+        source='stats.followers_count', read_only=True
+    )
+    following_count = serializers.IntegerField(
+        source='stats.following_count', read_only=True
+    )
+
+    class Meta:
+        model = User
+        fields = (
+            'username', 'first_name', 'last_name', 'posts_count',
+            'followers_count', 'following_count',
+        )
@@ -0,0 +1,124 @@
+import threading
+
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import caching, counters, follow_graph, search, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+_state = threading.local()
+
+
+def _deleting_posts():
+    """id постов, которые удаляются в этом потоке прямо сейчас."""
+    if not hasattr(_state, 'post_ids'):
+        _state.post_ids = set()
+    return _state.post_ids
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif update_fields != frozenset({'last_login'}):
+        caching.bump(
+            (caching.GLOBAL, None),
+            (caching.AUTHOR, instance.pk),
+            (caching.AUTHOR_CARD, instance.pk),
+        )
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    caching.bump(
+        (caching.GLOBAL, None),
+        (caching.GROUP, instance.pk),
+        (caching.GROUP_CARD, instance.pk),
+    )
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._previous_group_id = (
+        Post.objects.filter(pk=instance.pk).values_list(
+            'group_id', flat=True
+        ).first()
+        if instance.pk else None
+    )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    search.index_post(instance)
+    if created:
+        timeline.fan_out(instance)
+        counters.change_author_posts(instance.author_id, 1)
+        counters.change_group_posts(instance.group_id, 1)
+    elif instance._previous_group_id != instance.group_id:
+        counters.change_group_posts(instance._previous_group_id, -1)
+        counters.change_group_posts(instance.group_id, 1)
+    caching.bump(*caching.post_feeds(
+        instance, group_ids=[instance._previous_group_id]
+    ))
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # Комментарии удаляются каскадом раньше поста: их счётчик
+    # и кэши уходят вместе с постом, трогать их по одному незачем.
+    _deleting_posts().add(instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    _deleting_posts().discard(instance.pk)
+    counters.change_author_posts(instance.author_id, -1)
+    counters.change_group_posts(instance.group_id, -1)
+    caching.bump(*caching.post_feeds(instance))
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        counters.change_post_comments(instance.post_id, 1)
+        caching.bump(*caching.post_feeds(instance.post))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance.post_id in _deleting_posts():
+        return
+    counters.change_post_comments(instance.post_id, -1)
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        caching.bump(*caching.post_feeds(post))
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+        counters.change_follow_counts(
+            instance.user_id, instance.author_id, 1
+        )
+        follow_graph.changed(instance.user_id)
+        caching.bump(*_follow_feeds(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+    counters.change_follow_counts(instance.user_id, instance.author_id, -1)
+    follow_graph.changed(instance.user_id)
+    caching.bump(*_follow_feeds(instance))
+
+
+def _follow_feeds(follow):
+    """Лента подписчика и профили обоих — в них счётчики подписок."""
+    return (
+        (caching.FOLLOWER, follow.user_id),
+        (caching.AUTHOR, follow.user_id),
+        (caching.AUTHOR, follow.author_id),
+    )
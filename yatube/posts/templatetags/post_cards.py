@@ -0,0 +1,34 @@
+from django import template
+
+register = template.Library()
+
+
+class PostCardNode(template.Node):
+    def __init__(self, nodelist, post):
+        self.nodelist = nodelist
+        self.post = post
+
+    def render(self, context):
+        cards = context.get('card_cache')
+        if cards is None:
+            return self.nodelist.render(context)
+        post = self.post.resolve(context)
+        html = cards.get(post)
+        if html is None:
+            html = self.nodelist.render(context)
+            cards.set(post, html)
+        return html
+
+
+@register.tag
+def post_card(parser, token):
+    """{% post_card post %}...{% endpost_card %}: карточка поста
+    из кэша карточек страницы (caching.CardCache в card_cache)."""
+    bits = token.split_contents()
+    if len(bits) != 2:
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} принимает один аргумент — пост.'
+        )
+    nodelist = parser.parse(('endpost_card',))
+    parser.delete_first_token()
+    return PostCardNode(nodelist, parser.compile_filter(bits[1]))
@@ -0,0 +1,19 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail_url(post):
+    """URL готового превью; если его нет — ставит генерацию в очередь.
+
+    Для постов, прошедших thumbnails.prefetch, берёт готовое значение.
+    """
+    if hasattr(post, 'thumbnail_url'):
+        return post.thumbnail_url
+    url = thumbnails.cached_url(post.image)
+    if url is None:
+        thumbnails.schedule(post.image)
+    return url
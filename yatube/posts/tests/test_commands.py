@@ -0,0 +1,284 @@
+import datetime as dt
+import importlib.util
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock, skipUnless
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db.models import Count
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from sorl.thumbnail import default
+
+from posts import thumbnails, transfer
+from posts.models import (Comment, Follow, Group, Post, Recommendation,
+                          SearchTerm, TimelineEntry, User, UserStats)
+
+
+class TransferCommandsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        author = User.objects.create_user(username='transfer_author')
+        reader = User.objects.create_user(username='transfer_reader')
+        group = Group.objects.create(
+            title='Группа', slug='transfer', description='Описание'
+        )
+        self.post = Post.objects.create(
+            text='Старый пост про путешествие', author=author, group=group
+        )
+        self.pub_date = timezone.now() - dt.timedelta(days=30)
+        Post.objects.filter(pk=self.post.pk).update(pub_date=self.pub_date)
+        Post.objects.create(text='Пост без группы', author=reader)
+        Comment.objects.create(post=self.post, author=reader, text='Ответ')
+        Follow.objects.create(user=reader, author=author)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def clear(self):
+        Follow.objects.all().delete()
+        Post.objects.all().delete()
+        Group.objects.all().delete()
+        User.objects.all().delete()
+
+    def assertRestored(self):
+        self.assertEqual(Post.objects.count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        post = Post.objects.select_related(
+            'author__stats', 'group'
+        ).get(pk=self.post.pk)
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.author.username, 'transfer_author')
+        self.assertEqual(post.author.stats.posts_count, 1)
+        self.assertEqual(post.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+        self.assertTrue(
+            Follow.objects.filter(
+                user__username='transfer_reader', author=post.author
+            ).exists()
+        )
+        self.assertEqual(
+            TimelineEntry.objects.get(user__username='transfer_reader').post,
+            post
+        )
+        self.assertTrue(
+            SearchTerm.objects.filter(term='путешествие', post=post).exists()
+        )
+
+    def roundtrip(self, path, *args):
+        call_command('export_posts', path, *args, stderr=StringIO())
+        self.clear()
+        call_command('import_posts', path, *args, stdout=StringIO())
+        self.assertRestored()
+
+    def test_jsonl_roundtrip(self):
+        self.roundtrip(os.path.join(self.directory, 'dump.jsonl'))
+
+    def test_csv_roundtrip(self):
+        self.roundtrip(self.directory, '--format', 'csv')
+
+    def test_roundtrip_in_single_row_batches(self):
+        with mock.patch.object(transfer, 'BATCH_SIZE', 1):
+            self.roundtrip(os.path.join(self.directory, 'dump.jsonl'))
+
+    def test_import_twice_skips_existing_rows(self):
+        path = os.path.join(self.directory, 'dump.jsonl')
+        call_command('export_posts', path, stderr=StringIO())
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertRestored()
+
+    def test_import_rebuilds_only_imported_rows(self):
+        path = os.path.join(self.directory, 'dump.jsonl')
+        call_command('export_posts', path, stderr=StringIO())
+        self.clear()
+        bystander = User.objects.create_user(username='bystander')
+        Post.objects.create(text='Посторонний пост', author=bystander)
+        UserStats.objects.filter(user=bystander).update(posts_count=5)
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(
+            UserStats.objects.get(user=bystander).posts_count, 5
+        )
+        self.assertEqual(
+            UserStats.objects.get(
+                user__username='transfer_author'
+            ).posts_count,
+            1
+        )
+        self.assertEqual(
+            TimelineEntry.objects.get(user__username='transfer_reader').post,
+            self.post
+        )
+        self.assertTrue(
+            SearchTerm.objects.filter(term='путешествие').exists()
+        )
+
+    def test_import_fails_on_foreign_post_with_same_id(self):
+        path = os.path.join(self.directory, 'dump.jsonl')
+        call_command('export_posts', path, stderr=StringIO())
+        self.clear()
+        stranger = User.objects.create_user(username='stranger')
+        Post.objects.create(id=self.post.pk, text='Чужой', author=stranger)
+        with self.assertRaisesMessage(CommandError, str(self.post.pk)):
+            call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(Post.objects.get().text, 'Чужой')
+        self.assertFalse(Comment.objects.exists())
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailsCommandTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_generates_missing_thumbnails(self):
+        post = Post.objects.create(
+            author=User.objects.create_user(username='thumb_author'),
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='command.gif',
+                content=(
+                    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00'
+                    b'\x00\x00\x21\xf9\x04\x01\x00\x00\x00\x00\x2c'
+                    b'\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x01'
+                    b'\x00\x00\x3b'
+                ),
+                content_type='image/gif'
+            )
+        )
+        self.assertIsNone(thumbnails.cached_url(post.image))
+        out = StringIO()
+        call_command('generate_thumbnails', workers=1, stdout=out)
+        self.assertIn('1 из 1', out.getvalue())
+        thumbnail = default.kvstore.get(thumbnails.thumbnail_file(post.image))
+        self.assertIsNotNone(thumbnail)
+        self.assertTrue(default.storage.exists(thumbnail.name))
+        self.assertEqual(thumbnails.cached_url(post.image), thumbnail.url)
+
+
+class GenerateDataCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_generates_rows_and_derived_data(self):
+        out = StringIO()
+        call_command(
+            'generate_data', users=6, groups=2, posts=20, comments=30,
+            follows_per_user=2, seed=1, stdout=out
+        )
+        self.assertEqual(User.objects.count(), 6)
+        self.assertEqual(Group.objects.count(), 2)
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 30)
+        self.assertIn(f'follow: {Follow.objects.count()}', out.getvalue())
+        for post in Post.objects.annotate(total=Count('comments')):
+            self.assertEqual(post.comments_count, post.total)
+        for group in Group.objects.annotate(total=Count('posts')):
+            self.assertEqual(group.posts_count, group.total)
+        for user in User.objects.select_related('stats'):
+            self.assertEqual(
+                (
+                    user.stats.posts_count,
+                    user.stats.followers_count,
+                    user.stats.following_count,
+                ),
+                (
+                    user.posts.count(),
+                    user.following.count(),
+                    user.follower.count(),
+                )
+            )
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list('user_id', 'post_id')),
+            {
+                (follow.user_id, post_id)
+                for follow in Follow.objects.all()
+                for post_id in Post.objects.filter(
+                    author_id=follow.author_id
+                ).values_list('pk', flat=True)
+            }
+        )
+        self.assertFalse(
+            Post.objects.filter(search_terms__isnull=True).exists()
+        )
+
+
+@skipUnless(importlib.util.find_spec('scipy'), 'нужны numpy и scipy')
+class RecommendationsCommandTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        users = {
+            name: User.objects.create_user(username=name)
+            for name in ('anna', 'boris', 'vera', 'writer', 'poet', 'critic')
+        }
+        for user, authors in (
+            ('anna', ('writer', 'poet')),
+            ('boris', ('writer', 'poet', 'critic')),
+            ('vera', ('writer',)),
+        ):
+            for author in authors:
+                Follow.objects.create(
+                    user=users[user], author=users[author]
+                )
+        self.users = users
+        self.client = Client()
+        self.client.force_login(users['vera'])
+
+    def recommended(self, username):
+        return list(
+            Recommendation.objects.filter(
+                user__username=username
+            ).values_list('author__username', flat=True)
+        )
+
+    def test_recommends_co_followed_authors(self):
+        call_command('build_recommendations', stdout=StringIO())
+        self.assertEqual(self.recommended('vera'), ['poet', 'critic'])
+        self.assertEqual(self.recommended('anna'), ['critic'])
+        self.assertEqual(self.recommended('boris'), [])
+
+    def test_comments_add_interactions(self):
+        reader = User.objects.create_user(username='gleb')
+        post = Post.objects.create(text='Стихи', author=self.users['poet'])
+        Comment.objects.create(post=post, author=reader, text='Браво')
+        call_command('build_recommendations', stdout=StringIO())
+        self.assertEqual(self.recommended('gleb'), [])
+        call_command(
+            'build_recommendations', '--comment-weight', '1',
+            stdout=StringIO()
+        )
+        self.assertEqual(self.recommended('gleb'), ['writer', 'critic'])
+
+    def test_pages_show_recommendations_not_followed_yet(self):
+        call_command('build_recommendations', stdout=StringIO())
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [author.username for author in response.context['recommended']],
+            ['poet', 'critic']
+        )
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'poet'})
+        )
+        self.assertEqual(
+            [author.username for author in response.context['recommended']],
+            ['critic']
+        )
+        self.client.get(
+            reverse('posts:profile_follow', kwargs={'username': 'critic'})
+        )
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual(
+            [author.username for author in response.context['recommended']],
+            ['poet']
+        )
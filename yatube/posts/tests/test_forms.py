@@ -3,7 +3,9 @@ import tempfile
 
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from posts.models import Group, Post, User
@@ -107,3 +109,17 @@ class PostCreateFormTests(TestCase):
         post_2 = Post.objects.get(id=self.post.id)
         self.assertEqual(response_edit.status_code, 200)
         self.assertEqual(post_2.text, form_data['text'])
+
+    def test_edit_post_keeps_counters(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=[self.post.id]),
+                data={'text': 'Правка', 'group': self.group.id}
+            )
+        updates = [
+            query['sql'] for query in queries
+            if query['sql'].startswith(f'UPDATE "{Post._meta.db_table}"')
+        ]
+        self.assertTrue(updates)
+        for sql in updates:
+            self.assertNotIn('comments_count', sql)
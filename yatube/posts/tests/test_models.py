@@ -1,7 +1,11 @@
+from io import StringIO
+
 from django.contrib.auth import get_user_model
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post
+from .. import caching
+from ..models import Comment, Group, Post, UserStats
 
 User = get_user_model()
 
@@ -52,3 +56,73 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class CountersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='counter_author')
+        cls.group = Group.objects.create(
+            title='Группа счётчиков',
+            slug='counters',
+            description='Тестовое описание',
+        )
+        cls.other_group = Group.objects.create(
+            title='Другая группа',
+            slug='other',
+            description='Тестовое описание',
+        )
+
+    def assertCounters(self, author_posts, group_posts, other_posts):
+        self.assertEqual(
+            UserStats.objects.get(user=self.user).posts_count, author_posts
+        )
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group_posts)
+        self.assertEqual(self.other_group.posts_count, other_posts)
+
+    def test_post_counters_follow_create_edit_delete(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group
+        )
+        self.assertCounters(1, 1, 0)
+        post.group = self.other_group
+        post.save()
+        self.assertCounters(1, 0, 1)
+        post.delete()
+        self.assertCounters(0, 0, 0)
+
+    def test_comment_counter(self):
+        post = Post.objects.create(author=self.user, text='Пост')
+        comment = Comment.objects.create(
+            post=post, author=self.user, text='Комментарий'
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+
+    def test_recount_command_repairs_drift(self):
+        post = Post.objects.create(
+            author=self.user, text='Пост', group=self.group
+        )
+        Comment.objects.create(post=post, author=self.user, text='Текст')
+        UserStats.objects.filter(user=self.user).update(posts_count=7)
+        Group.objects.update(posts_count=5)
+        Post.objects.update(comments_count=0)
+        feeds = (
+            (caching.GLOBAL, None),
+            (caching.AUTHOR, self.user.pk),
+            (caching.GROUP, self.group.pk),
+        )
+        versions = caching.generations(feeds)
+        call_command('recount_counters', stdout=StringIO())
+        self.assertCounters(1, 1, 0)
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        changed = caching.generations(feeds)
+        for feed in feeds:
+            with self.subTest(feed=feed):
+                self.assertNotEqual(changed[feed], versions[feed])
@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.urls import urlpatterns
+
+
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create_user(username='reader')
+        cls.authors = [
+            User.objects.create_user(
+                username=f'author_{i}', first_name=f'Имя {i}'
+            )
+            for i in range(3)
+        ]
+        cls.groups = [
+            Group.objects.create(
+                title=f'Группа {i}',
+                slug=f'group_{i}',
+                description='Тестовое описание'
+            )
+            for i in range(3)
+        ]
+        Post.objects.bulk_create(
+            Post(
+                text=f'Тестовый пост {i}',
+                author=cls.authors[i % 3],
+                group=cls.groups[i % 3]
+            )
+            for i in range(12)
+        )
+        cls.post = Post.objects.create(
+            text='Пост автора ленты',
+            author=cls.test_user,
+            group=cls.groups[0]
+        )
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=author, text='Комментарий')
+            for author in cls.authors
+        )
+        for author in cls.authors:
+            Follow.objects.create(user=cls.test_user, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetTests.test_user)
+
+    def get_urls(self):
+        kwargs = {
+            'slug': self.groups[0].slug,
+            'username': self.authors[0].username,
+            'post_id': self.post.id,
+        }
+        urls = []
+        for pattern in urlpatterns:
+            names = pattern.pattern.converters.keys()
+            urls.append(reverse(
+                f'posts:{pattern.name}',
+                kwargs={name: kwargs[name] for name in names}
+            ))
+        return urls
+
+    def test_every_view_declares_budget(self):
+        for url in self.get_urls():
+            with self.subTest(url=url):
+                self.assertTrue(
+                    hasattr(resolve(url).func, 'query_budget')
+                )
+
+    def test_views_fit_query_budget(self):
+        for url in self.get_urls():
+            budget = resolve(url).func.query_budget
+            params = {'q': 'пост'} if url == reverse('posts:search') else {}
+            with self.subTest(url=url):
+                # Бюджет считается по холодному кэшу: граф подписок
+                # и поколения не должны достаться от предыдущего URL.
+                cache.clear()
+                with CaptureQueriesContext(connection) as queries:
+                    self.authorized_client.get(url, params)
+                self.assertLessEqual(
+                    len(queries), budget,
+                    '\n'.join(query['sql'] for query in queries)
+                )
+
+
+class DeleteQueriesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+
+    def delete_queries(self, comments):
+        post = Post.objects.create(text='Пост', author=self.author)
+        for i in range(comments):
+            Comment.objects.create(
+                post=post, author=self.reader, text=f'Комментарий {i}'
+            )
+        with CaptureQueriesContext(connection) as queries:
+            post.delete()
+        return len(queries)
+
+    def test_post_delete_does_not_touch_each_comment(self):
+        self.assertEqual(self.delete_queries(20), self.delete_queries(1))
+
+    def test_comment_delete_updates_counter(self):
+        post = Post.objects.create(text='Пост', author=self.author)
+        comment = Comment.objects.create(
+            post=post, author=self.reader, text='Комментарий'
+        )
+        comment.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
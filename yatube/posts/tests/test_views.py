@@ -1,12 +1,22 @@
+import base64
+import shutil
+import tempfile
 import uuid
+from http import HTTPStatus
+from unittest import mock
 
 from django import forms
+from django.conf import settings
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.db import connection
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
-from posts.models import Follow, Group, Post, User
+from posts import caching, follow_graph, search, thumbnails
+from posts.models import (Comment, Follow, Group, Post, TimelineEntry,
+                          User, UserStats)
+from posts.utils import CursorPaginator
 
 
 class PostViewsTest(TestCase):
@@ -52,6 +62,7 @@ class PostViewsTest(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.guest_client = Client()
         self.authorized_client = Client()
         self.authorized_client.force_login(PostViewsTest.test_user)
@@ -237,17 +248,28 @@ class PostViewsTest(TestCase):
     def test_cache_index(self):
         response = self.authorized_client.get(reverse('posts:index'))
         posts = response.content
+        Post.objects.filter(pk=self.post.pk).update(text='без сигналов')
+        response_old = self.authorized_client.get(reverse('posts:index'))
+        self.assertEqual(response_old.content, posts)
         Post.objects.create(
             text='test_new_post',
             author=self.test_user,
         )
-        response_old = self.authorized_client.get(reverse('posts:index'))
-        old_posts = response_old.content
-        self.assertEqual(old_posts, posts)
-        cache.clear()
         response_new = self.authorized_client.get(reverse('posts:index'))
-        new_posts = response_new.content
-        self.assertNotEqual(old_posts, new_posts)
+        self.assertContains(response_new, 'test_new_post')
+        # Карточка поста не менялась и берётся из своего кэша.
+        self.assertNotContains(response_new, 'без сигналов')
+
+    def test_feed_caches_do_not_collide(self):
+        reader = User.objects.create_user(username='reader')
+        reader_client = Client()
+        reader_client.force_login(reader)
+        self.authorized_client.get(reverse('posts:index'))
+        response = reader_client.get(reverse('posts:follow_index'))
+        self.assertNotContains(response, self.post.text)
+        Follow.objects.create(user=reader, author=self.test_user)
+        response = reader_client.get(reverse('posts:follow_index'))
+        self.assertContains(response, self.post.text)
 
 
 class PaginatorViewsTest(TestCase):
@@ -299,21 +321,86 @@ class PaginatorViewsTest(TestCase):
 
     def test_second_page_contains_three_posts(self):
         list_urls = {
-            reverse('posts:index') + '?page=2': 'index',
+            reverse('posts:index'): 'index',
             reverse(
                 'posts:group_list',
                 kwargs={'slug': PaginatorViewsTest.group.slug}
-            ) + '?page=2': 'group',
+            ): 'group',
             reverse(
                 'posts:profile',
                 kwargs={'username': PaginatorViewsTest.test_user}
-            ) + '?page=2': 'profile',
+            ): 'profile',
         }
         for tested_url in list_urls.keys():
-            response = self.client.get(tested_url)
-            self.assertEqual(
-                len(response.context.get('page_obj').object_list), 3
+            first_page = self.client.get(tested_url).context['page_obj']
+            response = self.client.get(
+                tested_url, {'cursor': first_page.next_cursor}
             )
+            page_obj = response.context.get('page_obj')
+            self.assertEqual(len(page_obj.object_list), 3)
+            self.assertFalse(page_obj.has_next())
+            self.assertTrue(page_obj.has_previous())
+
+    def test_cursor_pages_do_not_overlap(self):
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        second_page = self.client.get(
+            url, {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            len(set(first_page) | set(second_page)), len(self.posts)
+        )
+        back_page = self.client.get(
+            url, {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(list(back_page), list(first_page))
+        self.assertFalse(back_page.has_previous())
+
+    def test_invalid_cursor_returns_first_page(self):
+        url = reverse('posts:index')
+        first_page = self.client.get(url).context['page_obj']
+        response = self.client.get(url, {'cursor': 'broken'})
+        self.assertEqual(
+            list(response.context['page_obj']), list(first_page)
+        )
+
+    def test_foreign_cursor_returns_first_page(self):
+        cursors = {
+            'aware': 'n|2026-01-01T00:00:00+03:00|1',
+            'huge id': f'n|2026-01-01T00:00:00|{2 ** 63}',
+        }
+        urls = (
+            reverse('posts:index'),
+            reverse(
+                'posts:group_list',
+                kwargs={'slug': PaginatorViewsTest.group.slug}
+            ),
+            reverse('posts:post_detail', args=[Post.objects.first().pk]),
+        )
+        for name, raw in cursors.items():
+            cursor = base64.urlsafe_b64encode(raw.encode()).decode()
+            for url in urls:
+                with self.subTest(cursor=name, url=url):
+                    response = self.client.get(url, {'cursor': cursor})
+                    self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_cursor_condition_seeks_in_index(self):
+        paginator = CursorPaginator(Post.objects.all(), 10)
+        for direction, bound in (
+            (CursorPaginator.NEXT, 'pub_date<'),
+            (CursorPaginator.PREVIOUS, 'pub_date>'),
+        ):
+            forward = direction == CursorPaginator.NEXT
+            queryset = Post.objects.order_by(
+                *paginator._ordering(forward)
+            ).filter(paginator._after(self.posts[5].pub_date, 1, forward))
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                plan = ' '.join(str(row[-1]) for row in cursor.fetchall())
+            with self.subTest(direction=direction):
+                self.assertIn('USING INDEX', plan)
+                self.assertIn(bound, plan)
 
 
 class FollowTests(TestCase):
@@ -336,6 +423,7 @@ class FollowTests(TestCase):
         )
 
     def setUp(self):
+        cache.clear()
         self.client_auth_follower = Client()
         self.client_auth_following = Client()
         self.client_auth_follower.force_login(self.user_follower)
@@ -393,3 +481,484 @@ class FollowTests(TestCase):
             response,
             self.post.text
         )
+
+    def test_new_post_fans_out_to_followers(self):
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        new_post = Post.objects.create(
+            author=self.user_following,
+            text='Новая запись после подписки'
+        )
+        response = self.client_auth_follower.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(response.context['page_obj'][0], new_post)
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user=self.user_follower, post=new_post
+            ).exists()
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        Follow.objects.create(
+            user=self.user_follower,
+            author=self.user_following
+        )
+        self.client_auth_follower.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.user_following.username}
+            )
+        )
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.user_follower).exists()
+        )
+        response = self.client_auth_follower.get(
+            reverse('posts:follow_index')
+        )
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_follow_graph_answers_from_cache(self):
+        follow_graph.following_ids(self.user_follower.pk)
+        with self.assertNumQueries(0):
+            self.assertFalse(
+                follow_graph.is_following(
+                    self.user_follower, self.user_following.pk
+                )
+            )
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following
+        )
+        self.assertTrue(
+            follow_graph.is_following(
+                self.user_follower, self.user_following.pk
+            )
+        )
+        self.assertEqual(
+            follow_graph.following_among(
+                self.user_follower,
+                [self.user_following.pk, self.user_follower.pk]
+            ),
+            {self.user_following.pk}
+        )
+
+    def test_follow_counts(self):
+        url = reverse(
+            'posts:profile_follow',
+            kwargs={'username': self.user_following.username}
+        )
+        self.client_auth_follower.get(url)
+        self.client_auth_follower.get(url)
+        stats = UserStats.objects.in_bulk(
+            [self.user_follower.pk, self.user_following.pk]
+        )
+        self.assertEqual(stats[self.user_follower.pk].following_count, 1)
+        self.assertEqual(stats[self.user_following.pk].followers_count, 1)
+        self.client_auth_follower.get(
+            reverse(
+                'posts:profile_unfollow',
+                kwargs={'username': self.user_following.username}
+            )
+        )
+        stats = UserStats.objects.get(user=self.user_following)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_follow_unknown_author_returns_404(self):
+        response = self.client_auth_follower.get(
+            reverse('posts:profile_follow', kwargs={'username': 'nobody'})
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+
+    def test_follow_buttons_on_cached_index(self):
+        url = reverse('posts:index')
+        self.assertContains(self.client_auth_follower.get(url), 'Подписаться')
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following
+        )
+        self.assertContains(self.client_auth_follower.get(url), 'Отписаться')
+        response = self.client_auth_following.get(url)
+        self.assertNotContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_cached_follow_feed_shows_new_posts_and_edits(self):
+        Follow.objects.create(
+            user=self.user_follower, author=self.user_following
+        )
+        url = reverse('posts:follow_index')
+        self.client_auth_follower.get(url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Исправленная запись'
+        post.save()
+        self.assertContains(
+            self.client_auth_follower.get(url), 'Исправленная запись'
+        )
+        Post.objects.create(author=self.user_following, text='Свежий пост')
+        self.assertContains(self.client_auth_follower.get(url), 'Свежий пост')
+        self.assertNotIn(
+            (caching.FOLLOWER, self.user_follower.pk),
+            caching.post_feeds(post)
+        )
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='etag_author')
+        cls.reader = User.objects.create_user(username='etag_reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='etag_group',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            text='Тестовый пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = (
+            reverse('posts:post_detail', args=[self.post.id]),
+            reverse('posts:profile', args=[self.author.username]),
+            reverse('posts:group_list', args=[self.group.slug]),
+        )
+
+    def assertNotModified(self, client, url, **headers):
+        response = client.get(url, **headers)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_unchanged_pages_return_304(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.reader_client.get(url)['ETag']
+                self.assertNotModified(
+                    self.reader_client, url, HTTP_IF_NONE_MATCH=etag
+                )
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_post_detail_last_modified(self):
+        url = self.urls[0]
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertNotModified(
+            self.client, url, HTTP_IF_MODIFIED_SINCE=last_modified
+        )
+
+    def test_writes_change_etag(self):
+        etags = [self.reader_client.get(url)['ETag'] for url in self.urls]
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        Post.objects.create(
+            text='Новый пост', author=self.author, group=self.group
+        )
+        for url, etag in zip(self.urls, etags):
+            with self.subTest(url=url):
+                response = self.reader_client.get(
+                    url, HTTP_IF_NONE_MATCH=etag
+                )
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_group_rename_changes_post_etag(self):
+        url = self.urls[0]
+        etag = self.reader_client.get(url)['ETag']
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Переименованная группа'
+        group.save()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Переименованная группа')
+
+    def test_author_change_changes_group_etag(self):
+        url = self.urls[2]
+        etag = self.reader_client.get(url)['ETag']
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Переименованный'
+        author.save()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(response, 'Переименованный')
+
+    def test_group_change_changes_profile_etag(self):
+        url = self.urls[1]
+        etag = self.reader_client.get(url)['ETag']
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed_etag_group'
+        group.save()
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertContains(
+            response, reverse('posts:group_list', args=[group.slug])
+        )
+
+    def test_follow_changes_follow_buttons(self):
+        urls = (*self.urls[1:], reverse('posts:index'))
+        etags = [self.reader_client.get(url).get('ETag') for url in urls]
+        Follow.objects.create(user=self.reader, author=self.author)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+                response = self.reader_client.get(url, **headers)
+                self.assertContains(response, 'Отписаться')
+
+
+class CommentPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='commentator')
+        cls.post = Post.objects.create(text='Вирусный пост', author=cls.author)
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.author, text=f'Комментарий {i}')
+            for i in range(settings.COMMENTS_COUNT + 5)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_post_detail_shows_first_page(self):
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        )
+        comments = response.context['comments']
+        self.assertEqual(len(comments), settings.COMMENTS_COUNT)
+        self.assertEqual(comments[0].text, 'Комментарий 0')
+        self.assertContains(response, 'data-more-comments')
+
+    def test_fragment_loads_next_page(self):
+        cursor = self.client.get(
+            reverse('posts:post_detail', args=[self.post.id])
+        ).context['comments'].next_cursor
+        response = self.client.get(
+            reverse('posts:comments', args=[self.post.id]),
+            {'cursor': cursor}
+        )
+        self.assertTemplateNotUsed(response, 'base.html')
+        comments = response.context['comments']
+        self.assertEqual(
+            [comment.text for comment in comments],
+            [
+                f'Комментарий {i}' for i in range(
+                    settings.COMMENTS_COUNT, settings.COMMENTS_COUNT + 5
+                )
+            ]
+        )
+        self.assertNotContains(response, 'data-more-comments')
+
+
+class CardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            username='card_author', first_name='Лев', last_name='Толстой'
+        )
+        cls.group = Group.objects.create(
+            title='Классика', slug='classics', description='Романы'
+        )
+        cls.post = Post.objects.create(
+            text='Все счастливые семьи', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.get(reverse('posts:index'))
+
+    def test_unchanged_card_is_reused_on_page_miss(self):
+        Post.objects.filter(pk=self.post.pk).update(text='Не из кэша')
+        Post.objects.create(text='Новый пост', author=self.author)
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новый пост')
+        self.assertContains(response, 'Все счастливые семьи')
+
+    def test_edited_post_rerenders_card(self):
+        self.post.text = 'Все несчастливые семьи'
+        self.post.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Все несчастливые семьи')
+
+    def test_comment_rerenders_card(self):
+        Comment.objects.create(post=self.post, author=self.author, text='!')
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_author_change_rerenders_card(self):
+        self.author.first_name = 'Алексей'
+        self.author.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Алексей Толстой')
+
+    def test_group_change_rerenders_card(self):
+        self.group.slug = 'russian-classics'
+        self.group.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(
+            response, reverse('posts:group_list', args=['russian-classics'])
+        )
+
+    def test_author_change_rerenders_group_page(self):
+        url = reverse('posts:group_list', args=['classics'])
+        self.client.get(url)
+        author = User.objects.get(pk=self.author.pk)
+        author.first_name = 'Алексей'
+        author.save()
+        self.assertContains(self.client.get(url), 'Алексей Толстой')
+
+    def test_group_change_rerenders_profile_page(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        self.client.get(url)
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'russian-classics'
+        group.save()
+        self.assertContains(
+            self.client.get(url),
+            reverse('posts:group_list', args=['russian-classics'])
+        )
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create_user(username='search_user')
+        cls.post_match = Post.objects.create(
+            author=cls.test_user,
+            text='Ёжик в тумане: туман, ежик и снова ёжик'
+        )
+        cls.post_partial = Post.objects.create(
+            author=cls.test_user,
+            text='Туман над рекой и один ежик'
+        )
+        cls.post_other = Post.objects.create(
+            author=cls.test_user,
+            text='Совсем другая запись'
+        )
+
+    def test_search_ranks_matching_posts(self):
+        response = self.client.get(
+            reverse('posts:search'), {'q': 'ежик туман'}
+        )
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [self.post_match, self.post_partial]
+        )
+
+    def test_search_index_follows_edit_and_delete(self):
+        self.post_other.text = 'Теперь и здесь ежик'
+        self.post_other.save()
+        response = self.client.get(reverse('posts:search'), {'q': 'ежик'})
+        self.assertIn(self.post_other, response.context['page_obj'])
+        self.post_other.delete()
+        response = self.client.get(reverse('posts:search'), {'q': 'теперь'})
+        self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_admin_search_keeps_ranking(self):
+        admin = User.objects.create_superuser(
+            username='search_admin', email='admin@mail.ru', password='pass'
+        )
+        self.client.force_login(admin)
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'ежик туман'}
+        )
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            [self.post_match, self.post_partial]
+        )
+        response = self.client.get(
+            reverse('admin:posts_post_changelist'), {'q': ' '}
+        )
+        self.assertEqual(len(response.context['cl'].result_list), 0)
+
+    def test_search_reads_limited_postings_per_term(self):
+        with mock.patch.object(search, 'MAX_POSTINGS', 1):
+            self.assertEqual(
+                search.ranked_post_ids('ежик'), [self.post_partial.pk]
+            )
+
+    def test_admin_search_keeps_every_match(self):
+        with mock.patch.object(search, 'MAX_POSTINGS', 1):
+            posts = search.rank_posts(Post.objects.all(), 'ежик')
+            self.assertCountEqual(
+                posts, [self.post_match, self.post_partial]
+            )
+
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.test_user = User.objects.create_user(username='thumb_user')
+        cls.group = Group.objects.create(
+            title='Группа с картинками',
+            slug='thumb_group',
+            description='Тестовое описание'
+        )
+        cls.post = Post.objects.create(
+            author=cls.test_user,
+            group=cls.group,
+            text='Пост с картинкой',
+            image=SimpleUploadedFile(
+                name='thumb.gif',
+                content=(
+                    b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00'
+                    b'\x00\x00\x21\xf9\x04\x01\x00\x00\x00\x00\x2c'
+                    b'\x00\x00\x00\x00\x01\x00\x01\x00\x00\x02\x01'
+                    b'\x00\x00\x3b'
+                ),
+                content_type='image/gif'
+            )
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_placeholder_until_thumbnail_is_ready(self):
+        url = reverse('posts:post_detail', args=[self.post.id])
+        self.assertIsNone(thumbnails.cached_url(self.post.image))
+        response = self.client.get(url)
+        self.assertContains(response, 'bg-light')
+        thumbnail = thumbnails.generate(self.post.image.name)
+        self.assertEqual(
+            thumbnails.cached_url(self.post.image), thumbnail.url
+        )
+        response = self.client.get(url)
+        self.assertContains(response, thumbnail.url)
+
+    def test_ready_thumbnail_replaces_cached_placeholder(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.test_user.username]),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:post_detail', args=[self.post.id]),
+        )
+        etags = [self.client.get(url).get('ETag') for url in urls]
+        thumbnail = thumbnails.generate(self.post.image.name)
+        for url, etag in zip(urls, etags):
+            with self.subTest(url=url):
+                headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+                response = self.client.get(url, **headers)
+                self.assertContains(response, thumbnail.url)
+
+    def test_list_pages_prefetch_thumbnails_in_one_lookup(self):
+        thumbnail = thumbnails.generate(self.post.image.name)
+        posts = [self.post, Post.objects.get(pk=self.post.pk)]
+        cache.clear()
+        with self.assertNumQueries(1):
+            thumbnails.prefetch(posts)
+        with self.assertNumQueries(0):
+            thumbnails.prefetch(posts)
+        self.assertEqual(
+            [post.thumbnail_url for post in posts], [thumbnail.url] * 2
+        )
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, thumbnail.url)
@@ -0,0 +1,153 @@
+"""Превью картинок постов, которые готовятся вне запроса.
+
+Шаблоны не ресайзят оригинал сами: они берут готовое превью
+из key-value хранилища sorl-thumbnail, а пока его нет — показывают
+заглушку и ставят генерацию в фоновый пул потоков. Готовое превью
+меняет поколения лент с постами этой картинки, иначе заглушка осталась
+бы во фрагментах страниц и за их ETag.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connection, transaction
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore
+
+from . import caching
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+GEOMETRY = '960x339'
+OPTIONS = {'crop': 'center', 'upscale': True}
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.THUMBNAIL_WORKERS,
+    thread_name_prefix='thumbnails'
+)
+_in_progress = set()
+_lock = threading.Lock()
+
+
+class _Backend(ThumbnailBackend):
+    def thumbnail_file(self, file_, geometry_string, **options):
+        """Файл превью, который создал бы get_thumbnail, без генерации."""
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        return ImageFile(name, default.storage)
+
+
+_backend = _Backend()
+
+
+def thumbnail_file(image):
+    return _backend.thumbnail_file(image, GEOMETRY, **OPTIONS)
+
+
+def cached_url(image):
+    """URL готового превью или None, если его ещё нет."""
+    if not image:
+        return None
+    thumbnail = default.kvstore.get(thumbnail_file(image))
+    return thumbnail.url if thumbnail else None
+
+
+def _get_many_raw(keys):
+    """Сырые значения kvstore по ключам: один get_many в кэш
+    и один запрос в базу для промахов."""
+    kvstore = default.kvstore
+    empty = cached_db_kvstore.EMPTY_VALUE
+    if not isinstance(kvstore, cached_db_kvstore.KVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    values = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        found = dict(
+            KVStore.objects.filter(key__in=missing).values_list(
+                'key', 'value'
+            )
+        )
+        fetched = {key: found.get(key, empty) for key in missing}
+        kvstore.cache.set_many(
+            fetched, sorl_settings.THUMBNAIL_CACHE_TIMEOUT
+        )
+        values.update(fetched)
+    return {
+        key: None if value == empty else value
+        for key, value in values.items()
+    }
+
+
+def prefetch(posts):
+    """Проставляет постам thumbnail_url одним пакетным чтением kvstore.
+
+    Шаблонный тег post_thumbnail_url берёт готовое значение
+    и не ходит в хранилище за каждой карточкой.
+    """
+    keys = {
+        post.pk: add_prefix(thumbnail_file(post.image).key)
+        for post in posts if post.image
+    }
+    values = _get_many_raw(list(keys.values())) if keys else {}
+    for post in posts:
+        value = values.get(keys.get(post.pk))
+        post.thumbnail_url = (
+            deserialize_image_file(value).url if value else None
+        )
+        if post.image and value is None:
+            schedule(post.image)
+
+
+def generate(name):
+    """Создаёт превью для картинки из MEDIA_ROOT по её имени."""
+    ready = default.kvstore.get(thumbnail_file(name)) is not None
+    thumbnail = get_thumbnail(name, GEOMETRY, **OPTIONS)
+    if not ready:
+        posts = Post.objects.filter(image=name).only('author', 'group')
+        caching.bump(*{
+            feed for post in posts for feed in caching.post_feeds(post)
+        })
+    return thumbnail
+
+
+def _generate_in_worker(name):
+    try:
+        generate(name)
+    except Exception:
+        logger.exception('Не удалось создать превью для %s', name)
+    finally:
+        connection.close()
+        with _lock:
+            _in_progress.discard(name)
+
+
+def schedule(image):
+    """Ставит генерацию превью в фоновый пул после коммита транзакции."""
+    if not image:
+        return
+    name = image.name
+
+    def submit():
+        with _lock:
+            if name in _in_progress:
+                return
+            _in_progress.add(name)
+        _executor.submit(_generate_in_worker, name)
+
+    transaction.on_commit(submit)
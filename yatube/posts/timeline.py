@@ -0,0 +1,82 @@
+"""Fan-out on write для ленты подписок (TimelineEntry)."""
+from django.db import connection, transaction
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def _entries(user_id, posts):
+    return (
+        TimelineEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts
+    )
+
+
+def fan_out(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+            for user_id in followers.iterator()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту подписчика все посты автора."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    TimelineEntry.objects.bulk_create(
+        _entries(user_id, posts.iterator()),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает из ленты подписчика посты автора после отписки."""
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild(author_ids=None):
+    """Пересобирает ленты по таблице подписок.
+
+    Ленты заполняются одним INSERT ... SELECT из Follow и Post: база
+    соединяет таблицы сама, без запроса на каждую подписку. Пока идёт
+    пересборка, читатели видят старые ленты. С author_ids пересобираются
+    только записи постов этих авторов.
+    """
+    quote = connection.ops.quote_name
+    sql = (
+        f'INSERT INTO {quote(TimelineEntry._meta.db_table)} '
+        '(user_id, post_id, pub_date) '
+        'SELECT follow.user_id, post.id, post.pub_date '
+        f'FROM {quote(Follow._meta.db_table)} follow '
+        f'INNER JOIN {quote(Post._meta.db_table)} post '
+        'ON post.author_id = follow.author_id'
+    )
+    entries = TimelineEntry.objects.all()
+    params = []
+    if author_ids is not None:
+        author_ids = list(author_ids)
+        if not author_ids:
+            return
+        entries = entries.filter(post__author_id__in=author_ids)
+        sql += (
+            ' WHERE follow.author_id IN '
+            f'({", ".join(["%s"] * len(author_ids))})'
+        )
+        params = author_ids
+    with transaction.atomic():
+        entries.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
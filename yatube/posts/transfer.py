@@ -0,0 +1,407 @@
+"""Потоковый экспорт и импорт групп, постов, комментариев и подписок.
+
+Таблицы читаются через iterator() и пишутся пачками bulk_create,
+поэтому память не растёт вместе с объёмом данных. bulk_create
+не шлёт сигналы: счётчики, ленты, поисковый индекс и поколения кэша
+не обновляются на каждой строке, а пересобираются в rebuild_derived()
+после загрузки — только для пользователей, групп и постов из файла.
+Их id копятся не в памяти, а во временной таблице базы (_Touched).
+
+Пользователи, группы и посты в записях ссылаются друг на друга
+по username, slug и id поста; id постов и комментариев сохраняются.
+Если id из файла в базе уже занят другим постом или комментарием,
+импорт останавливается с ошибкой: иначе комментарии из файла
+прикрепились бы к чужому посту.
+"""
+import csv
+import json
+import os
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.color import no_style
+from django.db import connection
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, counters, follow_graph, search, timeline
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 1000
+
+MODELS = ('group', 'post', 'comment', 'follow')
+FIELDS = {
+    'group': ('slug', 'title', 'description'),
+    'post': ('id', 'text', 'pub_date', 'updated', 'author', 'group', 'image'),
+    'comment': ('id', 'post', 'author', 'text', 'created'),
+    'follow': ('user', 'author'),
+}
+_QUERIES = {
+    'group': lambda: Group.objects.values_list(
+        'slug', 'title', 'description'
+    ),
+    'post': lambda: Post.objects.values_list(
+        'id', 'text', 'pub_date', 'updated', 'author__username',
+        'group__slug', 'image'
+    ),
+    'comment': lambda: Comment.objects.values_list(
+        'id', 'post_id', 'author__username', 'text', 'created'
+    ),
+    'follow': lambda: Follow.objects.values_list(
+        'user__username', 'author__username'
+    ),
+}
+
+
+def _dump(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+def _load_datetime(value):
+    return parse_datetime(value) if value else timezone.now()
+
+
+def export_rows():
+    """Пары (модель, запись) по всем таблицам в порядке зависимостей."""
+    for model in MODELS:
+        queryset = _QUERIES[model]().order_by('pk')
+        for row in queryset.iterator(chunk_size=BATCH_SIZE):
+            yield model, dict(zip(FIELDS[model], map(_dump, row)))
+
+
+def write_jsonl(rows, stream):
+    count = 0
+    for model, record in rows:
+        stream.write(json.dumps(
+            {'model': model, **record}, ensure_ascii=False
+        ) + '\n')
+        count += 1
+    return count
+
+
+def read_jsonl(stream):
+    for line in stream:
+        if line.strip():
+            record = json.loads(line)
+            yield record.pop('model'), record
+
+
+def write_csv(rows, directory):
+    """Пишет по файлу <модель>.csv на каждую модель в directory."""
+    os.makedirs(directory, exist_ok=True)
+    files = {}
+    writers = {}
+    count = 0
+    try:
+        for model, record in rows:
+            if model not in writers:
+                files[model] = open(
+                    os.path.join(directory, f'{model}.csv'), 'w',
+                    newline='', encoding='utf-8'
+                )
+                writers[model] = csv.DictWriter(files[model], FIELDS[model])
+                writers[model].writeheader()
+            writers[model].writerow(record)
+            count += 1
+    finally:
+        for file in files.values():
+            file.close()
+    return count
+
+
+def read_csv(directory):
+    for model in MODELS:
+        path = os.path.join(directory, f'{model}.csv')
+        if not os.path.exists(path):
+            continue
+        with open(path, newline='', encoding='utf-8') as file:
+            for record in csv.DictReader(file):
+                yield model, record
+
+
+@contextmanager
+def _keep_dates():
+    """Отключает auto_now и auto_now_add, чтобы сохранить даты из файла."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Post._meta.get_field('updated'),
+        Comment._meta.get_field('created'),
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class ConflictError(ValueError):
+    """id из файла занят в базе другой строкой."""
+
+
+class _Touched:
+    """id строк, которые затронул импорт, во временной таблице.
+
+    Таблица живёт в соединении импорта и читается пачками по BATCH_SIZE
+    по возрастанию id, так что на файл любого размера в памяти не больше
+    одной пачки.
+    """
+
+    TABLE = 'import_touched'
+
+    def _execute(self, sql, params=()):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def create(self):
+        table = connection.ops.quote_name(self.TABLE)
+        self._execute(
+            f'CREATE TEMPORARY TABLE IF NOT EXISTS {table} '
+            '(kind varchar(16) NOT NULL, id bigint NOT NULL, '
+            'PRIMARY KEY (kind, id))'
+        )
+        self._execute(f'DELETE FROM {table}')
+
+    def add(self, kind, ids):
+        rows = [(kind, pk) for pk in set(ids)]
+        if not rows:
+            return
+        table = connection.ops.quote_name(self.TABLE)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'INSERT INTO {table} (kind, id) VALUES (%s, %s) '
+                'ON CONFLICT DO NOTHING',
+                rows
+            )
+
+    def chunks(self, kind):
+        table = connection.ops.quote_name(self.TABLE)
+        last = 0
+        while True:
+            ids = [pk for pk, in self._execute(
+                f'SELECT id FROM {table} WHERE kind = %s AND id > %s '
+                'ORDER BY id LIMIT %s',
+                (kind, last, BATCH_SIZE)
+            )]
+            if not ids:
+                return
+            yield ids
+            last = ids[-1]
+
+    def drop(self):
+        self._execute(
+            f'DROP TABLE IF EXISTS {connection.ops.quote_name(self.TABLE)}'
+        )
+
+
+class Loader:
+    """Копит записи одной модели и пишет их пачками bulk_create.
+
+    Уже существующие строки (тот же slug, подписка или id с теми же
+    автором и датой) пропускаются, поэтому повторный импорт того же
+    файла безопасен.
+    """
+
+    def __init__(self):
+        self.counts = dict.fromkeys(MODELS, 0)
+        self.user_ids = {}
+        self.group_ids = {}
+        self.touched = _Touched()
+        self.model = None
+        self.batch = []
+
+    def add(self, model, record):
+        if model not in FIELDS:
+            raise ValueError(f'Неизвестная модель: {model}')
+        if model != self.model:
+            self.flush()
+            self.model = model
+        self.batch.append(record)
+        if len(self.batch) >= BATCH_SIZE:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            # username и slug разрешаются заново для каждой пачки:
+            # кэш на весь файл рос бы вместе с ним.
+            self.user_ids.clear()
+            self.group_ids.clear()
+            getattr(self, f'_load_{self.model}')(self.batch)
+            self.counts[self.model] += len(self.batch)
+            self.batch = []
+
+    def load(self, rows):
+        self.touched.create()
+        with _keep_dates():
+            for model, record in rows:
+                self.add(model, record)
+            self.flush()
+        self._reset_sequences()
+        return self.counts
+
+    def _resolve_users(self, usernames):
+        missing = set(usernames) - self.user_ids.keys()
+        if not missing:
+            return
+        User.objects.bulk_create(
+            (
+                User(username=username, password=make_password(None))
+                for username in missing
+            ),
+            ignore_conflicts=True
+        )
+        resolved = dict(
+            User.objects.filter(username__in=missing).values_list(
+                'username', 'pk'
+            )
+        )
+        self.user_ids.update(resolved)
+        self.touched.add('user', resolved.values())
+
+    def _resolve_groups(self, slugs):
+        missing = set(slugs) - self.group_ids.keys()
+        if missing:
+            self.group_ids.update(
+                Group.objects.filter(slug__in=missing).values_list(
+                    'slug', 'pk'
+                )
+            )
+
+    def _check_conflicts(self, model, objects, fields):
+        """Проверяет, что занятые id принадлежат тем же строкам."""
+        existing = {
+            row[0]: row[1:]
+            for row in model.objects.filter(
+                pk__in=[obj.pk for obj in objects]
+            ).values_list('pk', *fields)
+        }
+        conflicts = [
+            obj.pk for obj in objects
+            if obj.pk in existing and existing[obj.pk] != tuple(
+                getattr(obj, field) for field in fields
+            )
+        ]
+        if conflicts:
+            raise ConflictError(
+                f'{model.__name__}: id '
+                f'{", ".join(map(str, conflicts[:10]))} уже заняты '
+                'в базе другими записями'
+            )
+
+    def _load_group(self, batch):
+        Group.objects.bulk_create(
+            (
+                Group(
+                    slug=record['slug'],
+                    title=record['title'],
+                    description=record['description'],
+                )
+                for record in batch
+            ),
+            ignore_conflicts=True
+        )
+
+    def _load_post(self, batch):
+        self._resolve_users(record['author'] for record in batch)
+        self._resolve_groups(
+            record['group'] for record in batch if record['group']
+        )
+        posts = [
+            Post(
+                id=int(record['id']),
+                text=record['text'],
+                pub_date=_load_datetime(record['pub_date']),
+                updated=_load_datetime(
+                    record['updated'] or record['pub_date']
+                ),
+                author_id=self.user_ids[record['author']],
+                group_id=self.group_ids.get(record['group'] or None),
+                image=record['image'] or '',
+            )
+            for record in batch
+        ]
+        self._check_conflicts(Post, posts, ('author_id', 'pub_date'))
+        Post.objects.bulk_create(posts, ignore_conflicts=True)
+        self.touched.add('author', (post.author_id for post in posts))
+        self.touched.add(
+            'group', (post.group_id for post in posts if post.group_id)
+        )
+        self.touched.add('post', (post.pk for post in posts))
+
+    def _load_comment(self, batch):
+        self._resolve_users(record['author'] for record in batch)
+        comments = [
+            Comment(
+                id=int(record['id']),
+                post_id=int(record['post']),
+                author_id=self.user_ids[record['author']],
+                text=record['text'],
+                created=_load_datetime(record['created']),
+            )
+            for record in batch
+        ]
+        self._check_conflicts(
+            Comment, comments, ('post_id', 'author_id', 'created')
+        )
+        Comment.objects.bulk_create(comments, ignore_conflicts=True)
+        self.touched.add('post', (comment.post_id for comment in comments))
+
+    def _load_follow(self, batch):
+        self._resolve_users(
+            username for record in batch
+            for username in (record['user'], record['author'])
+        )
+        Follow.objects.bulk_create(
+            (
+                Follow(
+                    user_id=self.user_ids[record['user']],
+                    author_id=self.user_ids[record['author']],
+                )
+                for record in batch if record['user'] != record['author']
+            ),
+            ignore_conflicts=True
+        )
+        self.touched.add(
+            'author', (self.user_ids[record['author']] for record in batch)
+        )
+        self.touched.add(
+            'follower', (self.user_ids[record['user']] for record in batch)
+        )
+
+    def _reset_sequences(self):
+        """Сдвигает последовательности id после вставки явных ключей."""
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Group, Post, Comment, Follow, User]
+        )
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+
+
+def rebuild_derived(loader):
+    """Пересобирает то, что при обычной записи делают сигналы.
+
+    Трогает только строки, которые затронул импорт, пачками
+    по BATCH_SIZE; всю базу пересобирают recount_counters,
+    rebuild_timeline и rebuild_search_index.
+    """
+    touched = loader.touched
+    for ids in touched.chunks('user'):
+        counters.recount(user_ids=ids, group_ids=(), post_ids=())
+    for ids in touched.chunks('group'):
+        counters.recount(user_ids=(), group_ids=ids, post_ids=())
+        caching.bump(*((caching.GROUP, pk) for pk in ids))
+    for ids in touched.chunks('post'):
+        counters.recount(user_ids=(), group_ids=(), post_ids=ids)
+        search.rebuild(ids)
+    for ids in touched.chunks('author'):
+        timeline.rebuild(ids)
+        caching.bump(*((caching.AUTHOR, pk) for pk in ids))
+    for ids in touched.chunks('follower'):
+        follow_graph.changed(*ids)
+        caching.bump(*((caching.FOLLOWER, pk) for pk in ids))
+    caching.bump((caching.GLOBAL, None))
+    touched.drop()
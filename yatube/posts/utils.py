@@ -1,8 +1,154 @@
+import base64
+from collections.abc import Sequence
+from datetime import datetime
+
 from django.conf import settings
 from django.core.paginator import Paginator
+from django.db.models import Q
+
+# Границы BIGINT: id за ними SQLite и PostgreSQL не сравнивают, а падают.
+MIN_ID = -2 ** 63
+MAX_ID = 2 ** 63 - 1
 
 
 def pagination(request, data):
     paginator = Paginator(data, settings.ITIEMS_COUNT)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
+
+
+def cursor_pagination(request, data, **kwargs):
+    paginator = CursorPaginator(data, settings.ITIEMS_COUNT, **kwargs)
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+class CursorPage(Sequence):
+    """Страница курсорной пагинации: без номера и общего числа страниц."""
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage {self.previous_cursor}:{self.next_cursor}>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Keyset-пагинация по паре (key_field, id).
+
+    Вместо COUNT(*) и OFFSET каждая страница выбирается условием
+    «строго после/до ключа последней записи», поэтому страница N стоит
+    столько же, сколько первая. Курсор — непрозрачный токен
+    с направлением и значением ключа.
+    """
+
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset, per_page, key_field='pub_date',
+                 id_field='id', descending=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.key_field = key_field
+        self.id_field = id_field
+        self.descending = descending
+
+    def encode_cursor(self, direction, obj):
+        key = getattr(obj, self.key_field).isoformat()
+        pk = getattr(obj, self.id_field)
+        raw = f'{direction}|{key}|{pk}'.encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """Возвращает (направление, ключ, id) или None для битого курсора."""
+        if not cursor:
+            return None
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            direction, key, pk = raw.split('|')
+            key, pk = datetime.fromisoformat(key), int(pk)
+        except (ValueError, UnicodeDecodeError):
+            return None
+        if direction not in (self.NEXT, self.PREVIOUS):
+            return None
+        # Даты в базе наивные (USE_TZ = False): курсор с часовым поясом
+        # выпущен не нами.
+        if key.tzinfo is not None or not MIN_ID <= pk <= MAX_ID:
+            return None
+        return direction, key, pk
+
+    def _ordering(self, forward):
+        prefix = '-' if self.descending == forward else ''
+        return (prefix + self.key_field, prefix + self.id_field)
+
+    def _after(self, key, pk, forward):
+        """Условие «строго после (key, pk)».
+
+        Отдельная граница key <= ключа (или >=) нужна индексу:
+        по одному OR из двух веток планировщик диапазон не выделяет
+        и читает индекс с начала, поэтому глубокие страницы дорожали.
+        """
+        lookup, bound = (
+            ('lt', 'lte') if self.descending == forward else ('gt', 'gte')
+        )
+        return Q(**{f'{self.key_field}__{bound}': key}) & (
+            Q(**{f'{self.key_field}__{lookup}': key})
+            | Q(**{self.key_field: key, f'{self.id_field}__{lookup}': pk})
+        )
+
+    def get_page(self, cursor=None):
+        position = self.decode_cursor(cursor)
+        forward = position is None or position[0] == self.NEXT
+        queryset = self.queryset.order_by(*self._ordering(forward))
+        if position is not None:
+            queryset = queryset.filter(self._after(*position[1:], forward))
+        items = list(queryset[:self.per_page + 1])
+        has_more = len(items) > self.per_page
+        items = items[:self.per_page]
+        if forward:
+            has_next, has_previous = has_more, position is not None
+        else:
+            items.reverse()
+            has_next, has_previous = True, has_more
+        if not items:
+            return CursorPage(items)
+        return CursorPage(
+            items,
+            next_cursor=(
+                self.encode_cursor(self.NEXT, items[-1])
+                if has_next else None
+            ),
+            previous_cursor=(
+                self.encode_cursor(self.PREVIOUS, items[0])
+                if has_previous else None
+            ),
+        )
+
+
+def query_budget(max_queries):
+    """Объявляет предельное число SQL-запросов на один запрос к view.
+
+    Лимит хранится в атрибуте view и проверяется тестами,
+    чтобы новые N+1 не проходили незамеченными.
+    """
+    def decorator(view):
+        view.query_budget = max_queries
+        return view
+    return decorator
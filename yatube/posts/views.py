@@ -1,74 +1,251 @@
+import hashlib
+
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db.models import Max
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
 
+from . import caching, follow_graph, recommendations, thumbnails
 from .forms import CommentForm, PostForm
-from .models import Follow, Group, Post, User
-from .utils import pagination
+from .models import Comment, Follow, Group, Post, TimelineEntry, User
+from .search import ranked_post_ids
+from .utils import (CursorPaginator, cursor_pagination, pagination,
+                    query_budget)
+
+
+def _etag(*parts):
+    return hashlib.md5('-'.join(map(str, parts)).encode()).hexdigest()
+
+
+def _post_state(request, post_id):
+    """(изменение поста или последний комментарий, id автора, id группы)."""
+    if not hasattr(request, '_post_state'):
+        row = Post.objects.filter(pk=post_id).annotate(
+            last_comment=Max('comments__created')
+        ).values_list(
+            'updated', 'last_comment', 'author_id', 'group_id'
+        ).first()
+        request._post_state = row and (
+            max(date for date in row[:2] if date is not None), *row[2:]
+        )
+    return request._post_state
+
+
+def post_last_modified(request, post_id):
+    state = _post_state(request, post_id)
+    return state and state[0]
+
+
+def post_etag(request, post_id):
+    state = _post_state(request, post_id)
+    return state and _etag(
+        *state,
+        caching.generation(caching.AUTHOR, state[1]),
+        state[2] and caching.generation(caching.GROUP_CARD, state[2]),
+        request.user.pk,
+    )
+
+
+def _card_versions(request, posts):
+    """Поколения карточек страницы ленты, которую отдаст view.
+
+    Переименование автора или группы меняет поколения их карточек,
+    а не ленты, поэтому ETag берёт их у постов самой страницы.
+    """
+    page = cursor_pagination(
+        request, posts.only('pub_date', 'author', 'group')
+    )
+    return caching.card_versions(page)
+
+
+def profile_etag(request, username):
+    row = User.objects.filter(username=username).annotate(
+        latest=Max('posts__pub_date')
+    ).values_list('pk', 'latest').first()
+    return row and _etag(
+        *row,
+        caching.generation(caching.AUTHOR, row[0]),
+        *_card_versions(request, Post.objects.filter(author_id=row[0])),
+        request.user.pk,
+        request.user.is_authenticated and caching.generation(
+            caching.FOLLOWER, request.user.pk
+        ),
+        caching.generation(caching.RECOMMENDATIONS),
+        request.GET.get('cursor', ''),
+    )
+
+
+def group_etag(request, slug):
+    row = Group.objects.filter(slug=slug).annotate(
+        latest=Max('posts__pub_date')
+    ).values_list('pk', 'latest').first()
+    return row and _etag(
+        *row,
+        caching.generation(caching.GROUP, row[0]),
+        *_card_versions(request, Post.objects.filter(group_id=row[0])),
+        request.user.pk,
+        request.user.is_authenticated and caching.generation(
+            caching.FOLLOWER, request.user.pk
+        ),
+        request.GET.get('cursor', ''),
+    )
+
+
+def follow_buttons(request, posts):
+    """Авторы страницы, на которых подписан читатель, и ключ варианта
+    фрагмента ленты с такими кнопками подписки.
+
+    Ключ включает поколение FOLLOWER читателя: подписка и отписка
+    меняют его, как и ETag страниц профиля и группы.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return frozenset(), ''
+    author_ids = {post.author_id for post in posts}
+    followed = follow_graph.following_among(user, author_ids)
+    own = user.pk if user.pk in author_ids else ''
+    return followed, _etag(
+        *sorted(followed), own, caching.generation(caching.FOLLOWER, user.pk)
+    )
 
 
+@query_budget(4)
 def index(request):
-    posts_list = Post.objects.all()
-    page_obj = pagination(request, posts_list)
+    posts_list = Post.objects.select_related('author', 'group')
+    page_obj = cursor_pagination(request, posts_list)
+    thumbnails.prefetch(page_obj)
+    followed, vary = follow_buttons(request, page_obj)
     template = 'posts/index.html'
     title = 'Последние обновления на сайте'
     context = {
         'page_obj': page_obj,
+        'card_cache': caching.CardCache(page_obj),
         'title': title,
-        'index': True
+        'index': True,
+        'followed_authors': followed,
+        'feed_cache': caching.feed_cache(
+            request, caching.GLOBAL, vary=vary, posts=page_obj
+        ),
     }
     return render(request, template, context)
 
 
+@query_budget(7)
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
-    posts_list = group.posts.all()
-    page_obj = pagination(request, posts_list)
+    posts_list = group.posts.select_related('author', 'group')
+    page_obj = cursor_pagination(request, posts_list)
+    thumbnails.prefetch(page_obj)
+    followed, vary = follow_buttons(request, page_obj)
     title = f'Записи сообщества { group }.'
     context = {
         'title': title,
         'group': group,
         'page_obj': page_obj,
+        'card_cache': caching.CardCache(page_obj),
+        'followed_authors': followed,
+        'feed_cache': caching.feed_cache(
+            request, caching.GROUP, group.pk, vary, page_obj
+        ),
     }
     return render(request, template, context)
 
 
+@query_budget(8)
+@condition(etag_func=profile_etag)
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = pagination(request, posts)
-    following = False
-    if request.user.is_authenticated:
-        following = Follow.objects.filter(
-            user=request.user, author=author
-        ).exists()
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    posts = author.posts.select_related('author', 'group')
+    page_obj = cursor_pagination(request, posts)
+    thumbnails.prefetch(page_obj)
+    following = follow_graph.is_following(request.user, author.pk)
     title = 'Профайл пользователя'
     context = {
         'title': title,
         'page_obj': page_obj,
+        'card_cache': caching.CardCache(page_obj),
         'author': author,
         'following': following,
+        'recommended': recommendations.for_user(
+            request.user, exclude={author.pk}
+        ),
+        'feed_cache': caching.feed_cache(
+            request, caching.AUTHOR, author.pk, posts=page_obj
+        ),
     }
     return render(request, template, context)
 
 
+@query_budget(5)
+@condition(etag_func=post_etag, last_modified_func=post_last_modified)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), id=post_id
+    )
     title = 'Пост'
     form = CommentForm(request.POST or None)
-    comments = post.comments.all()
     context = {
         'title': title,
         'post': post,
         'form': form,
-        'comments': comments,
+        'comments': comments_page(request, post.id),
     }
     return render(request, template, context)
 
 
+def comments_page(request, post_id):
+    """Страница комментариев от старых к новым по курсору из запроса."""
+    paginator = CursorPaginator(
+        Comment.objects.filter(post_id=post_id).select_related('author'),
+        settings.COMMENTS_COUNT,
+        key_field='created',
+        descending=False
+    )
+    return paginator.get_page(request.GET.get('cursor'))
+
+
+@query_budget(3)
+def post_comments(request, post_id):
+    """Фрагмент со следующей страницей комментариев для «Показать ещё»."""
+    template = 'includes/comment_list.html'
+    context = {
+        'post_id': post_id,
+        'comments': comments_page(request, post_id),
+    }
+    return render(request, template, context)
+
+
+@query_budget(7)
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    page_obj = pagination(request, ranked_post_ids(query))
+    posts = Post.objects.select_related('author', 'group').in_bulk(
+        page_obj.object_list
+    )
+    page_obj.object_list = [
+        posts[pk] for pk in page_obj.object_list if pk in posts
+    ]
+    thumbnails.prefetch(page_obj)
+    followed, _ = follow_buttons(request, page_obj)
+    context = {
+        'title': 'Поиск по записям',
+        'query': query,
+        'page_obj': page_obj,
+        'card_cache': caching.CardCache(page_obj),
+        'followed_authors': followed,
+    }
+    return render(request, 'posts/search.html', context)
+
+
 @login_required
+@query_budget(3)
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -78,6 +255,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author_id = request.user.id
         post.save()
+        thumbnails.schedule(post.image)
         return redirect('posts:profile', request.user)
     title = 'Новая запись'
     template = 'posts/create_post.html'
@@ -89,6 +267,7 @@ def post_create(request):
 
 
 @login_required
+@query_budget(4)
 def post_edit(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     if post.author_id != request.user.id:
@@ -100,7 +279,10 @@ def post_edit(request, post_id):
         files=request.FILES or None
     )
     if form.is_valid():
-        post.save()
+        # Счётчики поста меняются параллельно с правкой: пишем только
+        # поля формы.
+        post.save(update_fields=(*PostForm.Meta.fields, 'updated'))
+        thumbnails.schedule(post.image)
         return redirect('posts:post_detail', post_id)
     template = 'posts/create_post.html'
     title = 'Редактирование записи'
@@ -114,6 +296,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@query_budget(3)
 def add_comment(request, post_id):
     post = get_object_or_404(Post, id=post_id)
     form = CommentForm(request.POST or None)
@@ -126,30 +309,44 @@ def add_comment(request, post_id):
 
 
 @login_required
+@query_budget(5)
 def follow_index(request):
-    posts_list = Post.objects.filter(author__following__user=request.user)
-    page_obj = pagination(request, posts_list)
+    entries = TimelineEntry.objects.filter(
+        user=request.user
+    ).select_related('post__author', 'post__group')
+    page_obj = cursor_pagination(request, entries, id_field='post_id')
+    page_obj.object_list = [entry.post for entry in page_obj]
+    thumbnails.prefetch(page_obj)
+    followed, _ = follow_buttons(request, page_obj)
     title = 'Посты подписок'
     context = {
         'page_obj': page_obj,
+        'card_cache': caching.CardCache(page_obj),
         'title': title,
-        'follow': True
+        'follow': True,
+        'followed_authors': followed,
+        'recommended': recommendations.for_user(request.user),
+        'feed_cache': caching.feed_cache(
+            request, caching.FOLLOWER, request.user.pk, posts=page_obj
+        ),
     }
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@query_budget(4)
 def profile_follow(request, username):
     user = request.user
-    author = User.objects.get(username=username)
-    if user != author:
+    author = get_object_or_404(User, username=username)
+    if user != author and not follow_graph.is_following(user, author.pk):
         Follow.objects.get_or_create(user=user, author=author)
     return redirect('posts:profile', username)
 
 
 @login_required
+@query_budget(8)
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    is_follower = Follow.objects.filter(user=request.user, author=author)
-    is_follower.delete()
+    if follow_graph.is_following(request.user, author.pk):
+        Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', author)
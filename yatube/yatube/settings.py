@@ -38,10 +38,16 @@ INTERNAL_IPS = [
     '127.0.0.1',
 ]
 
+# Prometheus передаёт токен в заголовке «Authorization: Bearer <токен>».
+# Адрес клиента не проверяется: за nginx это всегда 127.0.0.1.
+# Пока токен не задан, /metrics/ закрыт.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
 # Application definition
 
 INSTALLED_APPS = [
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'core.apps.CoreConfig',
     'posts.apps.PostsConfig',
     'users.apps.UsersConfig',
@@ -52,10 +58,14 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     'django.contrib.admin',
     'sorl.thumbnail',
+    'rest_framework',
     'debug_toolbar',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.StaticFilesMiddleware',
+    'core.middleware.MetricsMiddleware',
+    'core.routers.ReplicaPinningMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -72,11 +82,16 @@ STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'core.backends.InstrumentedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
+        'APP_DIRS': DEBUG,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -88,6 +103,12 @@ TEMPLATES = [
         },
     },
 ]
+if not DEBUG:
+    # Шаблоны компилируются один раз на процесс, а yatube.wsgi
+    # прогревает их при старте (core.warmup).
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
 
@@ -99,9 +120,37 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами потока воркера.
+        'CONN_MAX_AGE': 0 if DEBUG else 600,
     }
 }
 
+# Реплики для чтения (core.routers): копии db.sqlite3, которые
+# обновляет manage.py sync_replicas. Например, ['replica1', 'replica2'].
+# Пустой список — всё читается из default.
+DATABASE_REPLICAS = []
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'NAME': os.path.join(BASE_DIR, f'{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# Сколько секунд после записи пользователь читает из default.
+REPLICA_PIN_SECONDS = 10
+
+# Выполняются на каждом новом соединении (core.signals).
+# WAL пускает читателей параллельно с писателем, busy_timeout
+# заставляет писателей ждать блокировку, а не падать.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64 * 1024,
+    'mmap_size': 256 * 2 ** 20,
+    'temp_store': 'MEMORY',
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -136,11 +185,17 @@ USE_L10N = True
 USE_TZ = False
 
 ITIEMS_COUNT = 10
+COMMENTS_COUNT = 20
 
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/2.2/howto/static-files/
 
 STATIC_URL = '/static/'
+STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Файлы без хеша в имени; файлы из манифеста кэшируются навсегда.
+STATIC_MAX_AGE = 60 * 60
+if not DEBUG:
+    STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
 
 LOGIN_URL = 'users:login'
 LOGIN_REDIRECT_URL = 'posts:index'
@@ -148,8 +203,36 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+# Кто отдаёт тело файлов из MEDIA_ROOT: None — Django через
+# FileResponse, 'x-sendfile' — Apache или lighttpd, 'x-accel-redirect' —
+# nginx с internal location MEDIA_ACCEL_PREFIX, смотрящей в MEDIA_ROOT.
+MEDIA_SENDFILE = None
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+# Оригиналы картинок; превью sorl-thumbnail кэшируются навсегда.
+MEDIA_MAX_AGE = 60 * 60 * 24
+if DEBUG:
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.backends.InstrumentedLocMemCache',
+        }
     }
+else:
+    # Один кэш на все воркеры: фрагменты лент, поколения и sorl.
+    CACHES = {
+        'default': {
+            'BACKEND': 'core.backends.InstrumentedSQLiteCache',
+            'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+            'TIMEOUT': 60 * 60 * 24,
+            'OPTIONS': {
+                'MAX_ENTRIES': 200_000,
+                'MAX_SIZE': 256 * 2 ** 20,
+            },
+        }
+    }
+FEED_CACHE_TIMEOUT = 60 * 60 * 6
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+REST_FRAMEWORK = {
+    'DEFAULT_PAGINATION_CLASS': 'api.pagination.KeysetPagination',
 }
+THUMBNAIL_WORKERS = 2